@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+# Baked assets
+# bake_assets.py writes pre-scaled images and transcoded songs to baked/ and lists them in baked/manifest.json.
+# The game asks here before loading an asset and gets the baked file instead when there is one.
+# A baked file is only used while its source is unchanged (same size and mtime, or failing that the same hash),
+# or when the source isn't there at all, e.g. the browser build which only ships the baked files.
+
+MANIFEST_PATH = os.path.join("baked", "manifest.json")
+MANIFEST_VERSION = 1
+
+
+def asset_key(file_path: str) -> str:
+    # Same key whichever way the path was written or whatever the OS
+    return os.path.normpath(file_path).replace(os.sep, "/")
+
+
+def image_key(file_path: str, width: int, height: int) -> str:
+    return f"{asset_key(file_path)}|{int(width)}x{int(height)}"
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as asset_file:
+        for chunk in iter(lambda: asset_file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetManifest:
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self.entries = None  # read on first use
+        self.checked = {}  # source path -> whether baked files made from it can be used
+
+    def load(self):
+        try:
+            with open(self.path, "r") as manifest_file:
+                data = json.load(manifest_file)
+        except (OSError, ValueError):
+            data = {}
+        if data.get("version") != MANIFEST_VERSION:
+            data = {}
+        self.entries = {"images": data.get("images", {}), "audio": data.get("audio", {})}
+
+    def image(self, file_path: str, width: int, height: int):
+        # Returns (baked path, has alpha) for the image at this size, or None
+        entry = self.find("images", image_key(file_path, width, height), file_path)
+        return None if entry is None else (entry["file"], entry["alpha"])
+
+    def audio(self, file_path: str):
+        # Returns the baked song's path, or None
+        entry = self.find("audio", asset_key(file_path), file_path)
+        return None if entry is None else entry["file"]
+
+    def find(self, kind: str, key: str, file_path: str):
+        if self.entries is None:
+            self.load()
+        entry = self.entries[kind].get(key)
+        if entry is None or not os.path.exists(entry["file"]) or not self.source_current(file_path, entry):
+            return None
+        return entry
+
+    def source_current(self, file_path: str, entry) -> bool:
+        current = self.checked.get(file_path)
+        if current is None:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                current = True  # only the baked version was shipped
+            else:
+                current = ((stat.st_size, stat.st_mtime_ns) == (entry["source_size"], entry["source_mtime"])
+                           or file_hash(file_path) == entry["source_hash"])
+            self.checked[file_path] = current
+        return current
+
+
+# Shared by the texture cache and the song loader
+assets = AssetManifest()
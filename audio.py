@@ -1,8 +1,22 @@
+import os
+import time
 import pygame as p
+from engine import init_audio
+from asset_manifest import assets
+
+# Audio
+# Audio decodes the whole file up front - use it for short sound effects that need to play instantly.
+# StreamingAudio has the same play/stop but streams through mixer.music, decoding a chunk at a time,
+# so a song costs a small buffer instead of tens of MB of PCM. Only one can play at a time.
+# Songs transcoded by bake_assets.py are streamed instead of the original when they're there.
 
 class Audio:
     def __init__(self, file_path: str):
+        start = time.perf_counter()
+        init_audio()
         self.sound = p.mixer.Sound(file_path)   #Finds audio file in directory
+        self.file_path = file_path
+        self.load_time = time.perf_counter() - start
 
     def play(self, loops: bool = False):    #Play function allows for looping if needed
         if loops:
@@ -12,3 +26,51 @@ class Audio:
 
     def stop(self):
         self.sound.stop()
+
+    def stats(self):
+        frequency, size, channels = p.mixer.get_init()
+        return {
+            "file": self.file_path,
+            "streaming": False,
+            "load_time": self.load_time,
+            "bytes": int(self.sound.get_length() * frequency * channels * abs(size) // 8),
+        }
+
+
+class StreamingAudio:
+    def __init__(self, file_path: str = None):
+        # file_path is None for charts without a song
+        self.source_path = file_path
+        baked = None if file_path is None else assets.audio(file_path)
+        self.file_path = file_path if baked is None else baked
+        self.load_time = 0.0
+
+    def play(self, loops: bool = False, start: float = 0.0):
+        # Opening the stream only reads the file header, the rest is decoded as it plays
+        load_start = time.perf_counter()
+        p.mixer.music.load(self.file_path)
+        self.load_time = time.perf_counter() - load_start
+        p.mixer.music.play(loops=-1 if loops else 0, start=start)
+
+    def stop(self):
+        p.mixer.music.stop()
+
+    def pause(self):
+        p.mixer.music.pause()
+
+    def unpause(self):
+        p.mixer.music.unpause()
+
+    def get_pos(self) -> int:
+        # Milliseconds of audio played since play(), -1 if not playing
+        return p.mixer.music.get_pos()
+
+    def stats(self):
+        if self.file_path is None:
+            return None
+        return {
+            "file": self.file_path,
+            "streaming": True,
+            "load_time": self.load_time,
+            "bytes": os.path.getsize(self.file_path),  # only the compressed file, read as it plays
+        }
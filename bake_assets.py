@@ -0,0 +1,232 @@
+import argparse
+import ast
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame as p
+from asset_manifest import MANIFEST_PATH, MANIFEST_VERSION, asset_key, image_key, file_hash
+from level_loader import resolve_level
+
+# Asset baking
+# Works out which images the game uses at which sizes and writes ready-to-use copies to baked/:
+#   python bake_assets.py
+# Sizes come from the game's source (Sprite/Label/Button/Timer/NotePool/NoteField calls with literal sizes and paths)
+# and from the textures listed by each level. Images are scaled once here with smoothscale and saved without
+# an alpha channel if nothing in them is see-through. Level songs are transcoded to Ogg Vorbis when ffmpeg is
+# installed, which every browser pygbag runs in can play. baked/manifest.json lists every baked file with
+# hashes of it and its source, so unchanged assets are skipped next time and the game can tell stale ones.
+# --strip-sources then deletes every original that has at least one baked copy, whether or not every size
+# the game loads it at was baked - for build checkouts only.
+
+BAKED_DIRECTORY = "baked"
+
+# Class -> (width argument, height argument, image keyword, image argument position)
+SIZED_CALLS = {
+    "Sprite": (0, 1, "file_path", 7),
+    "Label": (0, 1, "background", 9),
+    "Button": (0, 1, "background", 9),
+    "Timer": (0, 1, "background", 10),
+    "NotePool": (1, 2, "file_path", 3),
+    "NoteField": (1, 2, "file_path", 3),
+}
+
+
+def literal(node):
+    return node.value if isinstance(node, ast.Constant) else None
+
+
+def source_images(paths):
+    # (image path, width, height) for every call in the source with a literal image and size
+    found = set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as source_file:
+            tree = ast.parse(source_file.read(), path)
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name):
+                continue
+            call = SIZED_CALLS.get(node.func.id)
+            if call is None:
+                continue
+            width_arg, height_arg, keyword, position = call
+            image = next((literal(k.value) for k in node.keywords if k.arg == keyword), None)
+            if image is None and len(node.args) > position:
+                image = literal(node.args[position])
+            if len(node.args) <= max(width_arg, height_arg):
+                continue
+            width = literal(node.args[width_arg])
+            height = literal(node.args[height_arg])
+            if isinstance(image, str) and isinstance(width, int) and isinstance(height, int):
+                found.add((os.path.normpath(image), width, height))
+    return found
+
+
+def level_assets(levels_directory: str):
+    # Textures and songs listed by every level
+    images = set()
+    songs = set()
+    for directory in sorted(glob.glob(os.path.join(levels_directory, "*"))):
+        if not os.path.isdir(directory):
+            continue
+        try:
+            manifest = resolve_level(directory)
+        except (OSError, ValueError, KeyError) as error:
+            print(f"skipping {directory}: {error}")
+            continue
+        images.update(manifest.textures)
+        if manifest.audio_path is not None:
+            songs.add(manifest.audio_path)
+    return images, songs
+
+
+def baked_path(file_path: str, suffix: str, extension: str) -> str:
+    name, _ = os.path.splitext(asset_key(file_path))
+    return f"{BAKED_DIRECTORY}/{name}{suffix}{extension}"
+
+
+def source_fields(file_path: str) -> dict:
+    stat = os.stat(file_path)
+    return {"source_size": stat.st_size, "source_mtime": stat.st_mtime_ns, "source_hash": file_hash(file_path)}
+
+
+def up_to_date(entry, source) -> bool:
+    # Same source contents and the baked file hasn't been touched since
+    return (entry is not None and entry["source_hash"] == source["source_hash"]
+            and os.path.exists(entry["file"]) and file_hash(entry["file"]) == entry["hash"])
+
+
+def bake_image(file_path: str, width: int, height: int, source: dict) -> dict:
+    image = p.image.load(file_path).convert_alpha()
+    scaled = p.transform.smoothscale(image, (width, height))
+    # Fully opaque if every pixel's alpha is above 254
+    alpha = p.mask.from_surface(scaled, 254).count() < width * height
+    if not alpha:
+        opaque = p.Surface((width, height))
+        opaque.blit(scaled, (0, 0))
+        scaled = opaque
+
+    path = baked_path(file_path, f"-{width}x{height}", ".png")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    p.image.save(scaled, path)
+    return dict(source, file=path, alpha=alpha, hash=file_hash(path), width=width, height=height)
+
+
+def bake_song(file_path: str, source: dict, ffmpeg: str):
+    path = baked_path(file_path, "", ".ogg")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    result = subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-i", file_path, "-vn", "-c:a", "libvorbis",
+                             "-q:a", "4", path], capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"couldn't transcode {file_path}: {result.stderr.strip()}")
+        return None
+    return dict(source, file=path, hash=file_hash(path))
+
+
+def load_manifest() -> dict:
+    try:
+        with open(MANIFEST_PATH, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "images": {}, "audio": {}}
+
+
+def bake(source_paths, levels_directory: str, transcode: bool = True) -> dict:
+    old = load_manifest()
+    manifest = {"version": MANIFEST_VERSION, "images": {}, "audio": {}}
+    images, songs = level_assets(levels_directory)
+    images |= source_images(source_paths)
+    sources = {}
+    baked = 0
+
+    for file_path, width, height in sorted(images):
+        if not os.path.exists(file_path):
+            print(f"missing image {file_path}")
+            continue
+        if file_path not in sources:
+            sources[file_path] = source_fields(file_path)
+        key = image_key(file_path, width, height)
+        entry = old["images"].get(key)
+        if up_to_date(entry, sources[file_path]):
+            entry = dict(entry, **sources[file_path])  # e.g. a fresh checkout has new mtimes
+        else:
+            entry = bake_image(file_path, width, height, sources[file_path])
+            baked += 1
+        manifest["images"][key] = entry
+
+    ffmpeg = shutil.which("ffmpeg") if transcode else None
+    if transcode and ffmpeg is None and songs:
+        print("ffmpeg not found, songs are left as they are")
+    for file_path in sorted(songs) if ffmpeg is not None else ():
+        if not os.path.exists(file_path):
+            print(f"missing song {file_path}")
+            continue
+        source = source_fields(file_path)
+        key = asset_key(file_path)
+        entry = old["audio"].get(key)
+        if up_to_date(entry, source):
+            entry = dict(entry, **source)
+        else:
+            entry = bake_song(file_path, source, ffmpeg)
+            baked += 1
+        if entry is not None:
+            manifest["audio"][key] = entry
+
+    os.makedirs(BAKED_DIRECTORY, exist_ok=True)
+    with open(MANIFEST_PATH, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    manifest["baked"] = baked
+    return manifest
+
+
+def strip_sources(manifest: dict):
+    # Deletes every original with at least one baked copy, without checking other sizes are covered.
+    # Only safe if every size the game loads them at is written literally in the source (or listed by a level),
+    # so it's meant for throwaway build checkouts
+    paths = {entry_key.rsplit("|", 1)[0] for entry_key in manifest["images"]} | set(manifest["audio"])
+    removed = []
+    for path in sorted(paths):
+        if os.path.exists(path):
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description="bake eph's images and songs for faster loading")
+    parser.add_argument("--levels", default="levels", help="folder of levels")
+    parser.add_argument("--no-audio", action="store_true", help="don't transcode songs")
+    parser.add_argument("--strip-sources", action="store_true",
+                        help="delete original files that have been baked (for build checkouts)")
+    options = parser.parse_args(arguments)
+
+    started = time.perf_counter()
+    # convert_alpha needs a display mode, the dummy driver's will do
+    p.display.init()
+    p.display.set_mode((1, 1))
+    source_paths = sorted(glob.glob("*.py"))
+    manifest = bake(source_paths, options.levels, not options.no_audio)
+    entries = list(manifest["images"].items()) + list(manifest["audio"].items())
+    sources = {entry_key.rsplit("|", 1)[0]: entry["source_size"] for entry_key, entry in entries}
+    print(f"{len(manifest['images'])} images and {len(manifest['audio'])} songs in {MANIFEST_PATH}, "
+          f"{manifest['baked']} baked in {time.perf_counter() - started:.2f}s")
+    print(f"{sum(sources.values()) // 1024} KB of sources -> "
+          f"{sum(os.path.getsize(entry['file']) for _, entry in entries) // 1024} KB baked")
+
+    if options.strip_sources:
+        for path in strip_sources(manifest):
+            print("removed", path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Benchmarks
+# Times the engine's hot paths with no real window or sound (SDL dummy drivers), so it runs anywhere:
+#   python benchmark.py --save      record a baseline for this machine
+#   python benchmark.py             compare against it, exits with 1 if anything got slower
+# Each benchmark runs a few times with the garbage collector off and keeps the fastest run,
+# and all random data comes from fixed seeds, so runs on the same machine are comparable.
+# Baselines are per machine - record one before making changes, then compare after.
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame as p
+import engine
+engine.init()
+from window import Window
+from sprite import Sprite
+from texture_cache import textures
+from label import Label
+from timer import Timer
+from health_bar import HealthBar
+from custom_chart import CustomChart
+import chart_parser
+from chart_timeline import compile_chart
+from gameplay import GameSession
+from note_pool import NotePool
+from note_field import NoteField
+from dirty_renderer import DirtyRenderer
+from glyph_atlas import CachedText
+
+BASELINE_PATH = "benchmark_baseline.json"
+NOTE_COUNTS = (100, 1000, 10000)
+CHART_LINES = (10, 1000, 100_000, 1_000_000)
+NOTE_DENSITIES = (10, 100, 1000)  # notes per second
+FRAME_TICKS = 2  # 120 Hz ticks per 60 fps frame
+
+
+def measure(function, number: int, repeat: int, min_run: float = 0.05) -> float:
+    # Seconds per call of function, fastest of repeat runs of number calls
+    # Quick functions get more calls per run, so timer resolution and noise matter less
+    started = time.perf_counter_ns()
+    function()
+    once = (time.perf_counter_ns() - started) / 1_000_000_000
+    number = max(number, int(min_run / once) if once > 0 else number)
+
+    best = None
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter_ns()
+            for _ in range(number):
+                function()
+            elapsed = (time.perf_counter_ns() - started) / 1_000_000_000 / number
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best
+
+
+def write_chart(path: str, lines: int):
+    rng = random.Random(lines)
+    with open(path, "w") as chart_file:
+        for _ in range(lines // 2):
+            chart_file.write(f"wait {rng.choice((0.05, 0.1, 0.25))}\nspawn {rng.choice(('L', 'R', 'DOUBLE'))}\n")
+        chart_file.write("END GAME\n")
+
+
+def dense_chart(notes_per_second: int, seconds: float = 10.0):
+    rng = random.Random(notes_per_second)
+    notes_array = [["wait", "1"]]
+    for _ in range(int(notes_per_second * seconds)):
+        notes_array.append(["spawn", rng.choice(("L", "R"))])
+        notes_array.append(["wait", str(1 / notes_per_second)])
+    notes_array.append(["END", "GAME"])
+    return compile_chart(notes_array)
+
+
+def sprite_benchmarks(benchmark):
+    benchmark("sprite_init", lambda: Sprite(100, 100, 255, 255, 255, 0, 0), 2000)
+    benchmark("sprite_init_file", lambda: Sprite(100, 100, 0, 0, 0, 0, 0, file_path="assets/shark.png"), 2000)
+
+    def sprite_init_file_cold():
+        # The warm up fills the texture cache, so empty it every time to time loading the image itself
+        textures.clear()
+        Sprite(100, 100, 0, 0, 0, 0, 0, file_path="assets/shark.png")
+
+    benchmark("sprite_init_file_cold", sprite_init_file_cold, 200)
+
+    tap_line = Sprite(35, 350, 255, 255, 255, 50, 0)
+    for count in NOTE_COUNTS:
+        rng = random.Random(count)
+        sprites = []
+        for _ in range(count):
+            sprite = Sprite(100, 100, 255, 255, 255, rng.uniform(0, 1000), rng.choice((150, 510)))
+            sprite.velocity.x = -800
+            sprites.append(sprite)
+
+        def update():
+            for sprite in sprites:
+                sprite.update(1 / 120)
+
+        def collide():
+            for sprite in sprites:
+                tap_line.does_collide(sprite)
+
+        number = max(1, 100_000 // count)
+        benchmark(f"sprite_update_{count}", update, number)
+        benchmark(f"sprite_does_collide_{count}", collide, number)
+
+
+def text_benchmarks(benchmark, font):
+    label = Label(200, 100, 255, 255, 255, 0, 0, "", font, background="assets/button bg.png")
+    texts = [f"score: {i}" for i in range(100)]
+    index = [0]
+
+    def set_text():
+        index[0] = (index[0] + 1) % len(texts)
+        label.set_text(texts[index[0]])
+
+    benchmark("label_set_text", set_text, 1000)
+
+    timer = Timer(200, 100, 255, 255, 255, 0, 0, 0, 1, font)
+
+    def recreate_timer():
+        # A new second every call, the worst case
+        timer.current_time += 1
+        timer.recreate_timer()
+
+    benchmark("timer_recreate_timer", recreate_timer, 1000)
+
+    health_bar = HealthBar(200, 25, 255, 255, 255, 750, 50, 179, 229, 252, 100)
+    healths = [0, 25, 50, 75, 100]
+
+    def update_appearance():
+        # A new value every 10 frames, animating in between
+        if index[0] % 10 == 0:
+            health_bar.current_health = healths[index[0] // 10 % len(healths)]
+        index[0] += 1
+        health_bar.update(1 / 60)
+        health_bar.update_appearance()
+
+    benchmark("health_bar_update_appearance", update_appearance, 5000)
+
+
+def chart_benchmarks(benchmark, directory: str):
+    for lines in CHART_LINES:
+        path = os.path.join(directory, f"chart_{lines}.txt")
+        write_chart(path, lines)
+        sidecar_path = path + chart_parser.SIDECAR_EXTENSION
+        number = max(1, 10_000 // lines)
+        repeat = 3 if lines >= 100_000 else 5
+
+        def parse():
+            # Nothing cached: parses the text and writes the sidecar
+            chart_parser.loaded_charts.clear()
+            if os.path.exists(sidecar_path):
+                os.remove(sidecar_path)
+            CustomChart(path).read_chart()
+
+        def sidecar():
+            chart_parser.loaded_charts.clear()
+            CustomChart(path).read_chart()
+
+        benchmark(f"read_chart_{lines}", parse, number, repeat)
+        benchmark(f"read_chart_sidecar_{lines}", sidecar, number, repeat)
+
+
+def frame_benchmarks(benchmark, window, font):
+    # A whole game frame: ticks, then drawing everything through the dirty renderer
+    background = p.Surface((1000, 720))
+    background.fill((148, 201, 224))
+    tap_line = Sprite(35, 350, 255, 255, 255, 50, 0)
+    health_bar = HealthBar(200, 25, 255, 255, 255, 750, 50, 179, 229, 252, 100)
+    score_label = CachedText(font, (255, 255, 255), False)
+    travel_time = (1000 - 25) / 800
+
+    stores = [("pool", NotePool)]
+    if NoteField.available:
+        stores.append(("field", NoteField))
+    for density in NOTE_DENSITIES:
+        timeline = dense_chart(density)
+        for name, store in stores:
+            notes = store(timeline.peak_notes(1100 / 800) + 16, 100, 100, "assets/shark.png")
+            # Enough health that missing every note never ends the run
+            session = GameSession(timeline, travel_time, notes=notes, max_health=10 ** 9)
+            renderer = DirtyRenderer(window)
+            renderer.set_background(background)
+            dt = 1 / 120
+
+            def frame():
+                if session.over or session.song_time > timeline.end_time:
+                    session.start()
+                for _ in range(FRAME_TICKS):
+                    session.tick(dt)
+                health_bar.current_health = session.score % 100
+                health_bar.update(dt * FRAME_TICKS)
+                renderer.blit("score", score_label.set(f"score: {session.score}"), (775, 125))
+                renderer.draw(health_bar, changed=health_bar.update_appearance())
+                renderer.draw(tap_line)
+                notes.draw(renderer, -dt / 2)
+                renderer.present()
+
+            # Run into the chart so the screen is full of notes before timing
+            for _ in range(200):
+                frame()
+            benchmark(f"frame_{density}nps_{name}", frame, 100)
+
+
+def run(selected=None) -> dict:
+    window = Window(1000, 720, "eph benchmarks", "n")
+    font = p.font.Font(None, 32)
+    results = {}
+
+    def benchmark(name, function, number, repeat=5):
+        if selected and not any(pattern in name for pattern in selected):
+            return
+        function()  # warm up caches first, they're not what's being measured
+        results[name] = measure(function, number, repeat)
+        print(f"{name:36} {results[name] * 1_000_000:12.2f} us", flush=True)
+
+    directory = tempfile.mkdtemp(prefix="eph-benchmark-")
+    try:
+        sprite_benchmarks(benchmark)
+        text_benchmarks(benchmark, font)
+        chart_benchmarks(benchmark, directory)
+        frame_benchmarks(benchmark, window, font)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # Names of benchmarks more than tolerance slower than the baseline
+    regressions = []
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        change = seconds / before - 1
+        marker = ""
+        if change > tolerance:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"{name:36} {before * 1_000_000:12.2f} -> {seconds * 1_000_000:12.2f} us  {change:+7.1%}{marker}")
+    return regressions
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description="benchmark eph's hot paths")
+    parser.add_argument("names", nargs="*", help="only run benchmarks with any of these in their name")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="how much slower counts as a regression")
+    parser.add_argument("-o", "--output", help="also write the results to this JSON file")
+    options = parser.parse_args(arguments)
+
+    results = run(options.names)
+    report = {"python": sys.version.split()[0], "pygame": p.version.ver, "results": results}
+    if options.output is not None:
+        with open(options.output, "w") as output:
+            json.dump(report, output, indent=1)
+
+    if options.save:
+        with open(options.baseline, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=1)
+        print("baseline saved to", options.baseline)
+        return 0
+
+    if not os.path.exists(options.baseline):
+        print("no baseline to compare with, save one with --save")
+        return 0
+    with open(options.baseline, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+    print()
+    regressions = compare(results, baseline["results"], options.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,7 @@ import pygame
 
 class Button(Label):
     def __init__(self, width: int, height: int, text_red: int, text_green: int, text_blue: int, x, y, text: str,
-                 font: pygame.font.SysFont("Calibri", 28), background=None, command=None):
+                 font: pygame.font.Font, background=None, command=None):
         super().__init__(width, height, text_red, text_green, text_blue, x, y, text, font, background)
         self.command = command
 
@@ -0,0 +1,133 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from chart_parser import parse_chart
+from chart_timeline import TimelineBuilder
+
+# Chart analysis
+# Works out difficulty numbers for a pile of chart files without opening the game:
+#   python chart_analysis.py charts/ -o report.csv
+# Folders are searched for .txt charts. Charts are parsed with the game's own parser across a pool of
+# processes, and ones that don't parse (or have no notes) are reported as invalid instead of stopping the run.
+
+FIELDS = ("path", "valid", "error", "notes", "duration", "average_nps", "peak_nps",
+          "lane_switch_rate", "double_density", "min_wait")
+
+
+class AnalysisBuilder(TimelineBuilder):
+    # Also keeps track of the things the timeline doesn't store: the wait lines and which spawns were DOUBLE
+    def __init__(self):
+        super().__init__()
+        self.min_wait = None
+        self.spawns = 0
+        self.doubles = 0
+        self.switches = 0
+        self.previous_note = None
+
+    def wait(self, seconds: float):
+        super().wait(seconds)
+        if seconds > 0 and (self.min_wait is None or seconds < self.min_wait):
+            self.min_wait = seconds
+
+    def spawn(self, note: str):
+        super().spawn(note)
+        self.spawns += 1
+        if note == "DOUBLE":
+            self.doubles += 1
+        # Any change of note between one spawn and the next counts as a switch, e.g. L -> R or R -> DOUBLE
+        if self.previous_note is not None and note != self.previous_note:
+            self.switches += 1
+        self.previous_note = note
+
+
+def analyse_chart(path: str) -> dict:
+    result = dict.fromkeys(FIELDS)
+    result["path"] = path
+    result["valid"] = False
+    builder = AnalysisBuilder()
+    try:
+        timeline = parse_chart(path, builder)
+    except (OSError, ValueError) as error:
+        # ValueError covers ChartError and files that aren't text
+        result["error"] = str(error)
+        return result
+    if len(timeline) == 0:
+        result["error"] = "no notes"
+        return result
+
+    duration = timeline.end_time
+    result.update(
+        valid=True,
+        notes=len(timeline),
+        duration=round(duration, 6),
+        average_nps=round(len(timeline) / duration, 3) if duration > 0 else None,
+        # Most notes landing within any one second
+        peak_nps=timeline.peak_notes(1.0),
+        lane_switch_rate=round(builder.switches / (builder.spawns - 1), 3) if builder.spawns > 1 else 0.0,
+        double_density=round(builder.doubles / duration, 3) if duration > 0 else None,
+        min_wait=builder.min_wait,
+    )
+    return result
+
+
+def find_charts(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    if name.endswith(".txt"):
+                        yield os.path.join(directory, name)
+        else:
+            yield path
+
+
+def write_csv(results, output):
+    writer = csv.DictWriter(output, FIELDS)
+    writer.writeheader()
+    writer.writerows(results)
+
+
+def write_json(results, output):
+    json.dump(results, output, indent=1)
+    output.write("\n")
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description="work out difficulty metrics for eph charts")
+    parser.add_argument("charts", nargs="+", help="chart files, or folders to search for .txt charts")
+    parser.add_argument("-o", "--output", help="file to write, .json for JSON, anything else for CSV (default stdout)")
+    parser.add_argument("-f", "--format", choices=("csv", "json"), help="output format if not given by --output")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="charts to parse at once")
+    options = parser.parse_args(arguments)
+
+    output_format = options.format
+    if output_format is None:
+        output_format = "json" if options.output and options.output.endswith(".json") else "csv"
+
+    started = time.perf_counter()
+    paths = list(find_charts(options.charts))
+    if options.jobs > 1 and len(paths) > 1:
+        from multiprocessing import Pool
+        with Pool(options.jobs) as pool:
+            # Big chunks keep the pool from spending more time passing messages than parsing
+            results = pool.map(analyse_chart, paths, chunksize=max(1, min(64, len(paths) // (options.jobs * 4))))
+    else:
+        results = [analyse_chart(path) for path in paths]
+
+    write = write_json if output_format == "json" else write_csv
+    if options.output is None:
+        write(results, sys.stdout)
+    else:
+        with open(options.output, "w", newline="") as output:
+            write(results, output)
+
+    invalid = sum(not result["valid"] for result in results)
+    print(f"{len(results)} charts in {time.perf_counter() - started:.2f}s, {invalid} invalid", file=sys.stderr)
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from chart_timeline import ChartTimeline, TimelineBuilder
+
+# Chart parser
+# Reads chart files one line at a time straight into a ChartTimeline, checking every line as it goes.
+# Parsed charts are saved to a binary sidecar next to the chart (test_chart.txt -> test_chart.txt.chartc)
+# so the next load only has to copy two arrays out of it.
+#
+# Sidecar layout (little endian):
+#   header - magic, version, source mtime, source size, source hash, end time, note count
+#   times  - note count * float64, starts 8 byte aligned so the file can be mmapped
+#   lanes  - note count * int8
+
+SIDECAR_EXTENSION = ".chartc"
+SIDECAR_MAGIC = b"EPHC"
+SIDECAR_VERSION = 1
+HEADER = struct.Struct("<4sIqqQdI4x")
+
+# Charts already loaded this run, so retries never touch the file again
+loaded_charts = {}
+
+
+class ChartError(ValueError):
+    def __init__(self, path: str, line_no: int, message: str):
+        super().__init__(f"{path}:{line_no}: {message}")
+        self.path = path
+        self.line_no = line_no
+
+
+def parse_lines(lines, path: str = "<chart>", builder: TimelineBuilder = None) -> ChartTimeline:
+    # lines can be any iterable of strings - a file object is read lazily
+    if builder is None:
+        builder = TimelineBuilder()
+    for line_no, line in enumerate(lines, 1):
+        parts = line.split()
+        if not parts:
+            continue
+
+        command = parts[0]
+        if command == "END":
+            builder.end()
+            break
+        if command not in ("wait", "spawn"):
+            raise ChartError(path, line_no, f"unknown command '{command}'")
+        if len(parts) != 2:
+            raise ChartError(path, line_no, f"'{command}' takes exactly one value")
+
+        try:
+            if command == "wait":
+                builder.wait(float(parts[1]))
+            else:
+                builder.spawn(parts[1])
+        except ValueError as error:
+            raise ChartError(path, line_no, str(error)) from None
+
+    return builder.build()
+
+
+def parse_chart(path: str, builder: TimelineBuilder = None) -> ChartTimeline:
+    with open(path, "r") as chart_file:
+        return parse_lines(chart_file, path, builder)
+
+
+def load_chart(path: str, use_sidecar: bool = True) -> ChartTimeline:
+    # Fastest first: already loaded this run, then the sidecar, then parsing the text
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = loaded_charts.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    timeline = None
+    sidecar_path = path + SIDECAR_EXTENSION
+    if use_sidecar:
+        timeline = read_sidecar(sidecar_path, path, stat)
+    if timeline is None:
+        timeline = parse_chart(path)
+        if use_sidecar:
+            write_sidecar(sidecar_path, timeline, stat, source_hash(path))
+
+    loaded_charts[path] = (key, timeline)
+    return timeline
+
+
+def source_hash(path: str) -> int:
+    with open(path, "rb") as chart_file:
+        return int.from_bytes(hashlib.blake2b(chart_file.read(), digest_size=8).digest(), "little")
+
+
+def write_sidecar(sidecar_path: str, timeline: ChartTimeline, stat, digest: int):
+    times = array("d", timeline.times)
+    if sys.byteorder == "big":
+        times.byteswap()
+    header = HEADER.pack(SIDECAR_MAGIC, SIDECAR_VERSION, stat.st_mtime_ns, stat.st_size, digest,
+                         timeline.end_time, len(timeline))
+    temp_path = sidecar_path + ".tmp"
+    try:
+        with open(temp_path, "wb") as sidecar:
+            sidecar.write(header)
+            sidecar.write(times.tobytes())
+            sidecar.write(timeline.lanes.tobytes())
+        os.replace(temp_path, sidecar_path)
+    except OSError:
+        # Read-only folders (e.g. the browser build) just go without a sidecar
+        pass
+
+
+def read_sidecar(sidecar_path: str, path: str, stat):
+    # Returns None if there's no usable sidecar for this version of the chart
+    try:
+        with open(sidecar_path, "rb") as sidecar:
+            with mmap.mmap(sidecar.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if len(data) < HEADER.size:
+                    return None
+                magic, version, mtime_ns, size, digest, end_time, count = HEADER.unpack_from(data)
+                if magic != SIDECAR_MAGIC or version != SIDECAR_VERSION:
+                    return None
+                if len(data) != HEADER.size + count * 9:
+                    return None
+                # Same timestamp and size is trusted, otherwise fall back to comparing contents
+                if (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size) and digest != source_hash(path):
+                    return None
+
+                times = array("d")
+                times.frombytes(data[HEADER.size:HEADER.size + count * 8])
+                if sys.byteorder == "big":
+                    times.byteswap()
+                lanes = array("b")
+                lanes.frombytes(data[HEADER.size + count * 8:])
+    except (OSError, ValueError):
+        return None
+
+    return ChartTimeline(times, lanes, end_time)
@@ -0,0 +1,102 @@
+import math
+from array import array
+
+# Chart timeline
+# Compiles the lines of a chart (wait/spawn/END) into spawn events at absolute song times
+# The scheduler walks a cursor through them so each event is only looked at once
+
+LANE_L = 0  # top lane, hit with d/f/left click
+LANE_R = 1  # bottom lane, hit with j/k/right click
+
+
+class ChartTimeline:
+    def __init__(self, times: array, lanes: array, end_time: float):
+        self.times = times  # spawn time of each note in seconds, sorted
+        self.lanes = lanes  # lane of each note
+        self.end_time = end_time
+
+    def __len__(self):
+        return len(self.times)
+
+    def peak_notes(self, seconds: float) -> int:
+        # Most notes spawned within any stretch of this many seconds, i.e. the most on screen at once
+        times = self.times
+        peak = 0
+        start = 0
+        for end in range(len(times)):
+            while times[end] - times[start] > seconds:
+                start += 1
+            peak = max(peak, end - start + 1)
+        return peak
+
+
+class TimelineBuilder:
+    # Collects chart commands one at a time, keeping track of the song time they happen at
+    def __init__(self):
+        self.times = array("d")
+        self.lanes = array("b")
+        self.song_time = 0.0
+        self.end_time = None
+
+    def wait(self, seconds: float):
+        # float() takes "nan" and "inf", which would leave notes that never come due
+        if not math.isfinite(seconds):
+            raise ValueError(f"wait has to be a finite number of seconds: {seconds}")
+        if seconds < 0:
+            raise ValueError(f"wait can't be negative: {seconds}")
+        self.song_time += seconds
+
+    def spawn(self, note: str):
+        if note not in ("L", "R", "DOUBLE"):
+            raise ValueError(f"unknown note: {note}")
+        if note in ("L", "DOUBLE"):
+            self.times.append(self.song_time)
+            self.lanes.append(LANE_L)
+        if note in ("R", "DOUBLE"):
+            self.times.append(self.song_time)
+            self.lanes.append(LANE_R)
+
+    def end(self):
+        self.end_time = self.song_time
+
+    def build(self) -> ChartTimeline:
+        end_time = self.song_time if self.end_time is None else self.end_time
+        return ChartTimeline(self.times, self.lanes, end_time)
+
+
+def compile_chart(notes_array) -> ChartTimeline:
+    # notes_array is a split chart, e.g. [["wait", "0.5"], ["spawn", "R"], ["END", "GAME"]]
+    builder = TimelineBuilder()
+    for entry in notes_array:
+        command = entry[0]
+        if command == "END":
+            builder.end()
+            break
+        elif command == "wait":
+            builder.wait(float(entry[1]))
+        elif command == "spawn":
+            builder.spawn(entry[1])
+    return builder.build()
+
+
+class ChartScheduler:
+    def __init__(self, timeline: ChartTimeline):
+        self.timeline = timeline
+        self.cursor = 0
+
+    def reset(self):
+        self.cursor = 0
+
+    def due(self, song_time: float) -> range:
+        # Indices of every event that has become due since the last call
+        # Several events can come out at once if they fall inside the same frame
+        times = self.timeline.times
+        start = self.cursor
+        end = start
+        while end < len(times) and times[end] <= song_time:
+            end += 1
+        self.cursor = end
+        return range(start, end)
+
+    def finished(self, song_time: float) -> bool:
+        return self.cursor >= len(self.timeline) and song_time >= self.timeline.end_time
@@ -1,25 +1,18 @@
-from audio import Audio
-# CustomChart class, inherits from audio
+from audio import StreamingAudio
+from chart_parser import load_chart
+# CustomChart class, inherits from StreamingAudio so songs aren't decoded all at once
 # Allows player to make custom levels
 
 
-class CustomChart(Audio):
+class CustomChart(StreamingAudio):
     def __init__(self, chart_file_path: str, file_path: str=None):
+        # May swap file_path for a baked copy of the song
         super().__init__(file_path)
         self.chart_file_path = chart_file_path
-        self.file_path = file_path
+        self.timeline = None
 
     def read_chart(self):
-        # Opens text file, writes notes to array and formats so game can read it
-        chart_file = open(self.chart_file_path, "r")
-        self.notes_to_spawn = chart_file.readlines()
-        self.notes_array = []
-        for i in range(len(self.notes_to_spawn)):
-            self.notes_array.append(self.notes_to_spawn[i].split(" "))
-        print(self.notes_array)
-        for i in range(len(self.notes_array)):
-            self.notes_array[i][1] = self.notes_array[i][1].replace("\n", "")
-
-        print(self.notes_array)
-        chart_file.close()
-        return self.notes_to_spawn
\ No newline at end of file
+        # Parses the chart into a timeline of notes - only done once, retries reuse it
+        if self.timeline is None:
+            self.timeline = load_chart(self.chart_file_path)
+        return self.timeline
@@ -0,0 +1,154 @@
+import pygame as p
+from sprite_layer import SpriteLayer
+from render_target import RenderTarget
+
+# Dirty rectangle renderer
+# Sprites are handed over every frame, but only the ones that moved, changed or disappeared get redrawn.
+# The background is restored under just those areas, anything overlapping them is drawn again on top,
+# and only those areas are sent to the display. A screen where nothing changes costs almost nothing.
+# Batches of sprites (e.g. notes) go in layers, which are tracked as one area each instead of per sprite.
+# Everything is drawn in z order with a single Surface.blits() call per redrawn area, and anything
+# completely off screen is skipped.
+# Positions are all in the window's logical resolution, the render target maps them to the real window.
+
+class DirtyRenderer:
+    def __init__(self, window, full_redraw_ratio: float = 0.5, dynamic_resolution: bool = False):
+        self.window = window
+        self.target = RenderTarget(window, dynamic_resolution)
+        self.bounds = p.Rect((0, 0), window.logical_size)
+        self.background = None
+        self.drawn = {}  # key -> (surface, rect, z) for everything on screen last frame
+        self.frame = {}  # same for this frame, in draw order
+        self.layers = {}  # key -> SpriteLayer
+        self.changed = set()
+        self.full_redraw = True
+        # If more than this fraction of the screen is dirty just redraw all of it
+        self.full_redraw_ratio = full_redraw_ratio
+        self.blit_count = 0  # blits to the screen so far, for the profiler
+        self.drew = True  # whether the last present() changed anything on screen
+
+    def set_background(self, background):
+        # background should cover the whole window, changing it redraws everything
+        if background is not self.background:
+            self.background = background
+            self.full_redraw = True
+
+    def invalidate(self):
+        # Call after anything else has drawn to the window, e.g. it was resized or uncovered
+        self.full_redraw = True
+
+    def draw(self, sprite, changed=False, z=0):
+        # changed=True for sprites that redraw their own surface without replacing it
+        self.blit(sprite, sprite.surface, (sprite.position.x, sprite.position.y), changed, z)
+
+    def blit(self, key, surface, position, changed=False, z=0):
+        rect = surface.get_rect(topleft=(int(position[0]), int(position[1])))
+        if not rect.colliderect(self.bounds):
+            return
+        self.frame[key] = (surface, rect, z)
+        if changed:
+            self.changed.add(key)
+
+    def layer(self, key, z=0) -> SpriteLayer:
+        # The layer for key, made the first time it's asked for. Fill it every frame, it's emptied after present()
+        layer = self.layers.get(key)
+        if layer is None:
+            layer = SpriteLayer(z, self.bounds)
+            self.layers[key] = layer
+        return layer
+
+    def dirty_rects(self):
+        dirty = []
+        for key, (surface, rect, z) in self.frame.items():
+            old = self.drawn.get(key)
+            if old is None:
+                dirty.append(rect)
+            elif old[1] != rect or old[0] is not surface or key in self.changed:
+                dirty.append(old[1])
+                dirty.append(rect)
+        for key, (surface, rect, z) in self.drawn.items():
+            if key not in self.frame:
+                dirty.append(rect)
+        for layer in self.layers.values():
+            if layer.dirty():
+                for area in (layer.drawn_area, layer.area):
+                    if area is not None:
+                        dirty.append(area)
+        return merge_rects(dirty, self.bounds)
+
+    def draw_list(self):
+        # Everything to draw as (surface, position) pairs, lowest z first
+        groups = {}
+        for surface, rect, z in self.frame.values():
+            groups.setdefault(z, []).append((surface, rect))
+        for layer in self.layers.values():
+            if layer.items:
+                groups.setdefault(layer.z, []).extend(layer.items)
+        items = []
+        for z in sorted(groups):
+            items.extend(groups[z])
+        return items
+
+    def present(self):
+        target = self.target
+        if target.refresh():
+            self.full_redraw = True
+        dirty = [] if self.full_redraw else self.dirty_rects()
+        screen_area = self.bounds.width * self.bounds.height
+        if sum(rect.width * rect.height for rect in dirty) > screen_area * self.full_redraw_ratio:
+            self.full_redraw = True
+        self.drew = self.full_redraw or bool(dirty)
+        if not self.drew:
+            self.finish_frame()
+            return
+
+        # Surfaces redrawn in place need scaling again
+        if not target.identity:
+            for key in self.changed:
+                if key in self.frame:
+                    target.forget(self.frame[key][0])
+            for layer in self.layers.values():
+                if layer.changed:
+                    for surface in {item[0] for item in layer.items}:
+                        target.forget(surface)
+        items = target.map_items(self.draw_list())
+        background = target.scaled(self.background)
+        screen = target.surface
+        if self.full_redraw:
+            screen.blit(background, (0, 0))
+            screen.blits(items, doreturn=False)
+            self.blit_count += 1 + len(items)
+            target.show_all()
+            self.full_redraw = False
+        else:
+            areas = [target.map_rect(area) for area in dirty]
+            for area in areas:
+                # Clip so sprites only overwrite the area being fixed up, SDL skips the ones outside it
+                screen.set_clip(area)
+                screen.blit(background, area, area)
+                screen.blits(items, doreturn=False)
+                self.blit_count += 1 + len(items)
+            screen.set_clip(None)
+            target.show(areas)
+        self.finish_frame()
+
+    def finish_frame(self):
+        self.drawn, self.frame = self.frame, {}
+        self.changed.clear()
+        for layer in self.layers.values():
+            layer.finish_frame()
+
+
+def merge_rects(rects, bounds):
+    # Joins overlapping rects together and trims them to the screen
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if rect.width == 0 or rect.height == 0:
+            continue
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect = rect.union(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+import time
+import pygame as p
+
+# Frame pacer
+# Waits out the rest of each frame so the game runs at a steady target frame rate instead of spinning a core.
+# Most of the wait is a normal sleep through the event loop, and only the last moment before the frame is due
+# is spent spinning, since sleeps wake up late by different amounts on different machines. How late is learnt
+# as it goes, so the spinning stays as short as it can while frames still start on time.
+# Scenes that say they can idle (menus, pause) drop to idle_fps once nothing has been redrawn for idle_after
+# seconds, waking up early for any input. With the window in the background everything runs at background_fps.
+# In the browser (pygbag) the page's own frame timer does the pacing, so the wait is only ever a sleep.
+# EPH_FPS sets the target (0 for uncapped), EPH_VSYNC=1 leaves the pacing to the display's refresh.
+
+NS = 1_000_000_000
+MIN_SPIN_NS = 500_000
+MAX_SPIN_NS = 20_000_000
+SPIN_FRACTION = 4  # at most 1/SPIN_FRACTION of a frame is spent spinning
+POLL_NS = 10_000_000  # how often an idle wait checks for input
+
+
+class FramePacer:
+    def __init__(self, fps: int = 120, idle_fps: int = 5, background_fps: int = 15, idle_after: float = 0.5,
+                 vsync: bool = False):
+        self.fps = fps if fps else None  # None is as fast as possible (or as fast as vsync allows)
+        self.idle_fps = idle_fps
+        self.background_fps = background_fps
+        self.idle_after = int(idle_after * NS)
+        self.vsync = vsync
+        self.browser = sys.platform == "emscripten"
+        self.focused = True
+        self.static_since = None  # when the screen last stopped changing
+        self.deadline = time.perf_counter_ns()
+        self.spin_ns = 2_000_000  # spinning starts this long before the frame is due
+        self.slept_ns = 0  # totals so far, for the profiler
+        self.spun_ns = 0
+
+    @classmethod
+    def from_environment(cls, vsync: bool = False):
+        fps = os.environ.get("EPH_FPS")
+        return cls(fps=int(fps) if fps else 120, vsync=vsync)
+
+    def handle_event(self, event):
+        if event.type in (p.WINDOWFOCUSLOST, p.WINDOWMINIMIZED):
+            self.focused = False
+        elif event.type in (p.WINDOWFOCUSGAINED, p.WINDOWRESTORED):
+            self.focused = True
+
+    def frame_rate(self, scene_fps, drew: bool, now: int):
+        # (frames per second or None, whether input should cut the wait short)
+        if drew or scene_fps is None:
+            self.static_since = None
+        elif self.static_since is None:
+            self.static_since = now
+
+        fps = None if self.vsync else self.fps
+        if scene_fps is not None:
+            fps = scene_fps if fps is None else min(fps, scene_fps)
+        idle = self.static_since is not None and now - self.static_since >= self.idle_after
+        if idle:
+            fps = self.idle_fps
+        if not self.focused:
+            fps = self.background_fps if fps is None else min(fps, self.background_fps)
+        return fps, idle
+
+    async def wait(self, scene_fps=None, drew: bool = True):
+        # Call once a frame. scene_fps is the top scene's idle_fps, drew is whether anything was redrawn
+        now = time.perf_counter_ns()
+        fps, idle = self.frame_rate(scene_fps, drew, now)
+        if fps is None:
+            # Uncapped, or flipping the display already waits for the refresh
+            self.deadline = now
+            await asyncio.sleep(0)
+            return
+
+        period = NS // fps
+        self.deadline += period
+        if self.deadline <= now:
+            # A late frame starts the next one straight away, but a long stall doesn't turn into a burst of frames
+            self.deadline = max(self.deadline, now - period)
+            await asyncio.sleep(0)
+            return
+        await self.sleep_until(self.deadline, period, idle)
+
+    async def sleep_until(self, deadline: int, period: int, wake_on_input: bool):
+        started = time.perf_counter_ns()
+        if self.browser:
+            # Spinning would freeze the page, and its timer is all the precision there is anyway
+            await asyncio.sleep((deadline - started) / NS)
+            self.slept_ns += time.perf_counter_ns() - started
+            return
+
+        # Never more than a quarter of the frame is spun, even where sleeps wake up very late (e.g. Windows)
+        spin_ns = min(self.spin_ns, period // SPIN_FRACTION)
+        slept = False
+        while True:
+            now = time.perf_counter_ns()
+            coarse = deadline - now - spin_ns
+            if coarse <= 0:
+                break
+            if wake_on_input:
+                coarse = min(coarse, POLL_NS)
+            await asyncio.sleep(coarse / NS)
+            slept = True
+            # Sleeps that wake up late push spinning earlier, and it creeps back once they're on time
+            late = time.perf_counter_ns() - now - coarse
+            self.spin_ns = max(MIN_SPIN_NS, min(MAX_SPIN_NS, max(late * 5 // 4, self.spin_ns * 63 // 64)))
+            if wake_on_input and p.event.peek():
+                self.deadline = time.perf_counter_ns()
+                self.slept_ns += self.deadline - started
+                return
+        if not slept:
+            # The event loop (and the browser) still gets its turn every frame
+            await asyncio.sleep(0)
+
+        spin_started = time.perf_counter_ns()
+        self.slept_ns += spin_started - started
+        while time.perf_counter_ns() < deadline:
+            time.sleep(0)  # gives the rest of the time slice to e.g. the audio thread
+        self.spun_ns += time.perf_counter_ns() - spin_started
@@ -0,0 +1,60 @@
+import time
+
+# Fixed timestep game loop
+# Real time is measured with the nanosecond performance counter and collected in an accumulator,
+# then handed out to the simulation in fixed size ticks. However long a frame takes,
+# the simulation always moves in the same steps, so note movement stays smooth and in sync.
+# Rendering happens between ticks, so positions are interpolated using how far into the next tick we are.
+# clock can be swapped for another nanosecond time source, e.g. SongClock.time_ns to follow the music.
+
+class FixedTimestep:
+    def __init__(self, tick_rate: int = 120, max_steps: int = 10, clock=time.perf_counter_ns,
+                 drop_excess: bool = True):
+        self.tick_rate = tick_rate
+        self.step_ns = 1_000_000_000 // tick_rate
+        self.dt = self.step_ns / 1_000_000_000  # seconds per tick
+        # At most this many ticks run per frame. With drop_excess the rest of the time is thrown away,
+        # otherwise it's caught up over the next few frames (needed to stay in sync with a song)
+        self.max_steps = max_steps
+        self.drop_excess = drop_excess
+        self.clock = clock
+        self.accumulator = 0
+        self.previous_time = clock()
+
+    def reset(self):
+        # Forget any time that has built up, e.g. after loading
+        self.accumulator = 0
+        self.previous_time = self.clock()
+
+    def advance(self) -> int:
+        # Returns how many ticks the simulation should run this frame
+        current_time = self.clock()
+        # A clock that jumps backwards (a resynced song) leaves the accumulator owing time,
+        # so no ticks run until the clock has caught up with where the simulation already is
+        self.accumulator += current_time - self.previous_time
+        self.previous_time = current_time
+        if self.accumulator < 0:
+            return 0
+
+        steps = self.accumulator // self.step_ns
+        if steps > self.max_steps:
+            steps = self.max_steps
+            if self.drop_excess:
+                self.accumulator %= self.step_ns
+            else:
+                self.accumulator -= steps * self.step_ns
+        else:
+            self.accumulator -= steps * self.step_ns
+        return steps
+
+    def consume(self, steps: int):
+        # Ticks the simulation already ran outside advance() (e.g. catching up before judging a press)
+        self.accumulator -= steps * self.step_ns
+
+    def alpha(self) -> float:
+        # How far between the last tick and the next one we are, 0 to 1
+        return max(0, self.accumulator) / self.step_ns
+
+    def render_offset(self) -> float:
+        # Seconds to move things by when drawing so they sit between the previous tick and the last one
+        return (self.alpha() - 1) * self.dt
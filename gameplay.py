@@ -0,0 +1,118 @@
+import pygame as p
+from chart_timeline import ChartScheduler, LANE_L, LANE_R
+from hit_judge import LaneJudge, HitWindow, MISS
+
+# Gameplay rules
+# Everything that decides the score lives here with no drawing or window involved:
+# spawning from the chart, judging presses, misses, score, multiplier and health.
+# The game drives it from the song clock, and replays drive it straight from an input log,
+# so the same inputs at the same song times always give the same score.
+
+# Keys and mouse buttons for each lane
+LANE_KEYS = {p.K_f: LANE_L, p.K_d: LANE_L, p.K_j: LANE_R, p.K_k: LANE_R}
+LANE_BUTTONS = {p.BUTTON_LEFT: LANE_L, p.BUTTON_RIGHT: LANE_R}
+
+
+def input_lane(kind: str, code: int):
+    # kind is "key" or "mouse", returns None for inputs that don't hit a lane
+    if kind == "key":
+        return LANE_KEYS.get(code)
+    return LANE_BUTTONS.get(code)
+
+
+class GameSession:
+    def __init__(self, timeline, travel_time: float, window: HitWindow = None, notes=None, max_health: int = 100,
+                 spawn_x: float = 1000, note_speed: float = 800, lane_y=(150, 510)):
+        self.timeline = timeline
+        self.scheduler = ChartScheduler(timeline)
+        self.judge = LaneJudge(2, window)
+        self.travel_time = travel_time  # seconds from spawning to reaching the tap line
+        # notes is a NotePool or NoteField to show the notes, None when running without a window
+        self.notes = notes
+        self.max_health = max_health
+        self.spawn_x = spawn_x
+        self.note_speed = note_speed
+        self.lane_y = lane_y
+        self.start()
+
+    def start(self, song_time: float = 0.0):
+        self.song_time = song_time
+        self.ticks = 0  # fixed steps run since the start
+        self.scheduler.reset()
+        self.judge.clear()
+        if self.notes is not None:
+            self.notes.release_all()
+        self.score = 0
+        self.mult = 1
+        self.health = self.max_health / 2
+        self.judgements = {}
+        self.over = False
+        self.won = False
+
+    def tick(self, dt: float):
+        # Moves the game on by one fixed step
+        if self.over:
+            return
+        self.song_time += dt
+        self.ticks += 1
+        if self.notes is not None:
+            self.notes.update(dt)
+        self.expire(self.song_time)
+
+        # Spawn every note that has come due this tick, moved on by however late it is
+        timeline = self.timeline
+        for i in self.scheduler.due(self.song_time):
+            lane = timeline.lanes[i]
+            note = i
+            if self.notes is not None:
+                x = self.spawn_x - self.note_speed * (self.song_time - timeline.times[i])
+                note = self.notes.spawn(x, self.lane_y[lane], lane, -self.note_speed)
+            self.judge.add(lane, timeline.times[i] + self.travel_time, note)
+
+        if not self.over and self.scheduler.finished(self.song_time) and len(self.judge) == 0:
+            self.over = True
+            self.won = True
+
+    def catch_up(self, song_time: float, dt: float) -> int:
+        # Runs every tick that's due by song_time, so notes that should have spawned by then can be judged.
+        # Presses call this first, since after a stall the game can be well behind the song. Returns the ticks run
+        steps = 0
+        while not self.over and self.song_time + dt <= song_time:
+            self.tick(dt)
+            steps += 1
+        return steps
+
+    def expire(self, song_time: float):
+        for note in self.judge.expired(song_time):
+            self.miss(note, MISS)
+
+    def press(self, lane: int, song_time: float):
+        # Judges the next note in this lane only, returns the judgement or None
+        if self.over:
+            return None
+        # Misses up to now are counted first, however long ago the last tick was
+        self.expire(song_time)
+        judgement, note = self.judge.press(lane, song_time)
+        if judgement == MISS:
+            self.miss(note, judgement)
+        elif judgement is not None:
+            self.score += 1*self.mult
+            if self.health != self.max_health and self.mult >= 2:
+                self.mult -= 1
+            self.hit(note, judgement)
+        return judgement
+
+    def hit(self, note, judgement):
+        self.judgements[judgement] = self.judgements.get(judgement, 0) + 1
+        self.health = min(self.max_health, self.health + 25)
+        if self.notes is not None:
+            self.notes.release(note)
+
+    def miss(self, note, judgement):
+        self.judgements[judgement] = self.judgements.get(judgement, 0) + 1
+        self.health = max(0, self.health - 25)
+        self.mult += 1
+        if self.notes is not None:
+            self.notes.release(note)
+        if self.health == 0:
+            self.over = True
@@ -0,0 +1,103 @@
+import string
+import pygame as p
+from profiler import allocations
+
+# Glyph atlas text rendering
+# Every character is rasterized once per font and colour into a single atlas surface.
+# Strings are then put together by copying glyphs out of the atlas instead of calling font.render.
+# CachedText goes one step further and keeps the finished surface until the text actually changes.
+
+ATLAS_CHARACTERS = string.digits + string.ascii_letters + string.punctuation + " "
+
+
+class GlyphAtlas:
+    def __init__(self, font, colour, antialias: bool = True, characters: str = ATLAS_CHARACTERS):
+        self.font = font
+        self.colour = colour
+        self.antialias = antialias
+        self.glyphs = {}  # character -> (surface, area in that surface)
+
+        rendered = [(character, self.render_glyph(character)) for character in characters]
+        self.height = max([glyph.get_height() for _, glyph in rendered] + [font.get_height()])
+        self.atlas = p.Surface((max(1, sum(glyph.get_width() for _, glyph in rendered)), self.height), p.SRCALPHA)
+        allocations.surfaces += 1
+        x = 0
+        for character, glyph in rendered:
+            area = p.Rect(x, 0, glyph.get_width(), self.height)
+            # MAX against the empty atlas copies the glyph exactly, a normal blit would darken the edges
+            self.atlas.blit(glyph, area, special_flags=p.BLEND_RGBA_MAX)
+            self.glyphs[character] = (self.atlas, area)
+            x += area.width
+
+    def render_glyph(self, character):
+        allocations.font_renders += 1
+        glyph = self.font.render(character, self.antialias, self.colour)
+        allocations.surfaces += 1
+        if p.display.get_surface() is None:
+            return glyph
+        allocations.surfaces += 1
+        return glyph.convert_alpha()
+
+    def glyph(self, character):
+        found = self.glyphs.get(character)
+        if found is None:
+            # Characters outside the atlas are rendered once and kept on their own
+            surface = self.render_glyph(character)
+            found = (surface, surface.get_rect())
+            self.glyphs[character] = found
+        return found
+
+    def size(self, text: str):
+        return sum(self.glyph(character)[1].width for character in text), self.height
+
+    def render(self, text: str):
+        # Same result as font.render(text, antialias, colour), minus kerning
+        glyphs = [self.glyph(character) for character in text]
+        surface = p.Surface((max(1, sum(area.width for _, area in glyphs)), self.height), p.SRCALPHA)
+        allocations.surfaces += 1
+        blits = []
+        x = 0
+        for source, area in glyphs:
+            blits.append((source, (x, 0), area, p.BLEND_RGBA_MAX))
+            x += area.width
+        surface.blits(blits, doreturn=False)
+        return surface
+
+
+class TextRenderer:
+    # Keeps one atlas per (font, colour, antialias)
+    def __init__(self):
+        self.atlases = {}
+
+    def atlas(self, font, colour, antialias: bool = True) -> GlyphAtlas:
+        key = (font, tuple(colour), antialias)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = GlyphAtlas(font, colour, antialias)
+            self.atlases[key] = atlas
+        return atlas
+
+    def render(self, font, text: str, antialias: bool, colour):
+        return self.atlas(font, colour, antialias).render(text)
+
+
+# Shared by every label in the game
+text_renderer = TextRenderer()
+
+
+class CachedText:
+    # A line of text that only gets laid out again when it changes
+    def __init__(self, font, colour, antialias: bool = True, text: str = ""):
+        self.font = font
+        self.colour = colour
+        self.antialias = antialias
+        self.text = None
+        self.surface = None
+        self.set(text)
+
+    def set(self, text: str):
+        # Returns the surface for text - the same surface object as last time if nothing changed
+        if text != self.text:
+            self.text = text
+            self.surface = text_renderer.render(self.font, text, self.antialias, self.colour)
+        return self.surface
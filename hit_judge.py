@@ -0,0 +1,66 @@
+from collections import deque
+
+# Hit judgement
+# Each lane keeps its notes in a queue ordered by when they should be hit.
+# A press only ever looks at the front of its lane's queue, so one press judges at most one note.
+
+PERFECT = "perfect"
+GOOD = "good"
+MISS = "miss"
+
+
+class HitWindow:
+    # How far off (in seconds, early or late) a press can be for each judgement
+    def __init__(self, perfect: float = 0.035, good: float = 0.085, miss: float = 0.12):
+        self.perfect = perfect
+        self.good = good
+        self.miss = miss
+
+    def judge(self, offset: float):
+        # offset is press time minus the note's hit time, None means too early to count
+        offset = abs(offset)
+        if offset <= self.perfect:
+            return PERFECT
+        if offset <= self.good:
+            return GOOD
+        if offset <= self.miss:
+            return MISS
+        return None
+
+
+class LaneJudge:
+    def __init__(self, lane_count: int = 2, window: HitWindow = None):
+        self.window = HitWindow() if window is None else window
+        self.lanes = [deque() for _ in range(lane_count)]
+
+    def add(self, lane: int, hit_time: float, note):
+        # Notes have to be added in hit time order, which the chart timeline already is
+        self.lanes[lane].append((hit_time, note))
+
+    def press(self, lane: int, song_time: float):
+        # Returns (judgement, note), or (None, None) if there's nothing close enough to hit
+        queue = self.lanes[lane]
+        if not queue:
+            return None, None
+        hit_time, note = queue[0]
+        judgement = self.window.judge(song_time - hit_time)
+        if judgement is None:
+            return None, None
+        queue.popleft()
+        return judgement, note
+
+    def expired(self, song_time: float) -> list:
+        # Notes that have gone past the miss window without being pressed
+        missed = []
+        for queue in self.lanes:
+            while queue and song_time - queue[0][0] > self.window.miss:
+                missed.append(queue.popleft()[1])
+        return missed
+
+    def clear(self):
+        for queue in self.lanes:
+            queue.clear()
+
+    def __len__(self):
+        # Notes still waiting to be hit or missed
+        return sum(len(queue) for queue in self.lanes)
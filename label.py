@@ -1,4 +1,6 @@
 from sprite import Sprite
+from glyph_atlas import text_renderer
+from profiler import allocations
 import pygame
 
 
@@ -7,15 +9,28 @@ import pygame
 
 class Label(Sprite):
     def __init__(self, width: int, height: int, text_red: int, text_green: int, text_blue: int, x, y, text: str,
-                 font: pygame.font.SysFont("Calibri", 28), background=None):
+                 font: pygame.font.Font, background=None):
         if background is None:
 
             super().__init__(width, height, 0, 0, 0, x, y)
         else:
             super().__init__(width, height, 0, 0, 0, x, y, file_path=background)
 
-        self.text = text
+        # Cached background is shared, so text is always drawn onto a copy
+        self.background_surface = self.surface
+        self.text_colour = (text_red, text_green, text_blue)
         self.font = font
-        rendered_text = font.render(text, True, (text_red, text_green, text_blue))
-        rendered_text = pygame.transform.scale(rendered_text, (width, height))
-        self.surface.blit(rendered_text, (0, 0))
\ No newline at end of file
+        self.text = None
+        self.set_text(text)
+
+    def set_text(self, text: str):
+        # Only rasterizes when the text is different, and replaces the surface so renderers see the change
+        if text == self.text:
+            return
+        self.text = text
+        surface = self.background_surface.copy()
+        rendered_text = text_renderer.render(self.font, text, True, self.text_colour)
+        rendered_text = pygame.transform.scale(rendered_text, (self.width, self.height))
+        surface.blit(rendered_text, (0, 0))
+        allocations.surfaces += 2  # the copy and the scaled text
+        self.surface = surface
@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import statistics
+from contextlib import contextmanager
+from chart_parser import parse_chart
+from level_loader import MANIFEST_NAME, resolve_level
+
+# Level catalog
+# Keeps an sqlite index of every level under levels/ with its note count, length, density, BPM and song.
+# refresh() only stats the files of each level and re-parses the ones that changed since they were indexed,
+# so the level select screen can sort and filter a big library without opening every chart.
+
+INDEX_NAME = "catalog.db"
+SCHEMA_VERSION = 1
+SORT_COLUMNS = ("name", "note_count", "duration", "density", "bpm")
+
+
+class LevelInfo:
+    def __init__(self, row):
+        self.directory = row["directory"]
+        self.name = row["name"]
+        self.chart_path = row["chart_path"]
+        self.audio_path = row["audio_path"]
+        self.note_count = row["note_count"]
+        self.duration = row["duration"]
+        self.density = row["density"]  # notes per second
+        self.bpm = row["bpm"]
+        self.error = row["error"]
+
+
+def estimate_bpm(times) -> float:
+    # Charts don't store a tempo, so take the most common gap between notes as a beat
+    gaps = [round(b - a, 3) for a, b in zip(times, times[1:]) if b - a > 0.01]
+    if not gaps:
+        return 0.0
+    bpm = 60 / statistics.mode(gaps)
+    # Fold into a normal tempo range - fast streams are usually fractions of a beat
+    while bpm > 200:
+        bpm /= 2
+    while bpm < 60:
+        bpm *= 2
+    return round(bpm, 1)
+
+
+class LevelCatalog:
+    def __init__(self, levels_directory: str = "levels", index_path: str = None):
+        self.levels_directory = levels_directory
+        self.index_path = os.path.join(levels_directory, INDEX_NAME) if index_path is None else index_path
+        with self.connect() as database:
+            if database.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                database.execute("DROP TABLE IF EXISTS levels")
+                database.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+            database.execute("""CREATE TABLE IF NOT EXISTS levels (
+                directory TEXT PRIMARY KEY, name TEXT, chart_path TEXT, audio_path TEXT,
+                chart_mtime INTEGER, chart_size INTEGER, manifest_mtime INTEGER,
+                note_count INTEGER, duration REAL, density REAL, bpm REAL, error TEXT)""")
+            for column in SORT_COLUMNS:
+                database.execute(f"CREATE INDEX IF NOT EXISTS levels_{column} ON levels ({column})")
+
+    @contextmanager
+    def connect(self):
+        # A fresh connection each time, so refresh() can run on a loading thread
+        database = sqlite3.connect(self.index_path)
+        database.row_factory = sqlite3.Row
+        try:
+            with database:
+                yield database
+        finally:
+            database.close()
+
+    def refresh(self) -> int:
+        # Brings the index up to date, returns how many levels had to be parsed
+        with self.connect() as database:
+            known = {row["directory"]: row for row in database.execute(
+                "SELECT directory, chart_path, chart_mtime, chart_size, manifest_mtime FROM levels")}
+            found = set()
+            parsed = 0
+            for entry in sorted(os.scandir(self.levels_directory), key=lambda entry: entry.name):
+                if not entry.is_dir():
+                    continue
+                directory = os.path.normpath(entry.path)
+                found.add(directory)
+                if self.is_current(known.get(directory), directory):
+                    continue
+                database.execute("INSERT OR REPLACE INTO levels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 self.index_level(directory))
+                parsed += 1
+
+            for directory in known.keys() - found:
+                database.execute("DELETE FROM levels WHERE directory = ?", (directory,))
+        return parsed
+
+    def is_current(self, row, directory: str) -> bool:
+        if row is None or row["chart_path"] is None:
+            return False
+        try:
+            chart_stat = os.stat(row["chart_path"])
+        except OSError:
+            return False
+        return ((chart_stat.st_mtime_ns, chart_stat.st_size) == (row["chart_mtime"], row["chart_size"])
+                and manifest_mtime(directory) == row["manifest_mtime"])
+
+    def index_level(self, directory: str):
+        manifest = None
+        chart_stat = None
+        try:
+            manifest = resolve_level(directory)
+            chart_stat = os.stat(manifest.chart_path)
+            # Parsed without the load cache or a sidecar, so indexing a big library keeps nothing in memory
+            timeline = parse_chart(manifest.chart_path)
+        except (OSError, ValueError, KeyError) as error:
+            # Broken levels are indexed too, so they aren't parsed again until they change
+            if chart_stat is None:
+                return (directory, os.path.basename(directory), None, None, None, None, manifest_mtime(directory),
+                        0, 0.0, 0.0, 0.0, str(error))
+            return (directory, manifest.name, manifest.chart_path, manifest.audio_path,
+                    chart_stat.st_mtime_ns, chart_stat.st_size, manifest_mtime(directory), 0, 0.0, 0.0, 0.0, str(error))
+
+        duration = timeline.end_time
+        density = len(timeline) / duration if duration > 0 else 0.0
+        return (directory, manifest.name, manifest.chart_path, manifest.audio_path,
+                chart_stat.st_mtime_ns, chart_stat.st_size, manifest_mtime(directory),
+                len(timeline), duration, density, estimate_bpm(timeline.times), None)
+
+    def filters(self, min_density, max_density, include_broken):
+        conditions = []
+        values = []
+        if not include_broken:
+            conditions.append("error IS NULL")
+        if min_density is not None:
+            conditions.append("density >= ?")
+            values.append(min_density)
+        if max_density is not None:
+            conditions.append("density < ?")
+            values.append(max_density)
+
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), values
+
+    def levels(self, sort: str = "name", descending: bool = False, min_density: float = None,
+               max_density: float = None, limit: int = None, offset: int = 0, include_broken: bool = False):
+        # Sorting and filtering happen in sqlite, using the column indexes
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"can't sort levels by {sort}")
+        where, values = self.filters(min_density, max_density, include_broken)
+        query = "SELECT * FROM levels" + where
+        query += f" ORDER BY {sort} {'DESC' if descending else 'ASC'}, name"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            values += [limit, offset]
+        with self.connect() as database:
+            return [LevelInfo(row) for row in database.execute(query, values)]
+
+    def count(self, min_density: float = None, max_density: float = None, include_broken: bool = False) -> int:
+        where, values = self.filters(min_density, max_density, include_broken)
+        with self.connect() as database:
+            return database.execute("SELECT COUNT(*) FROM levels" + where, values).fetchone()[0]
+
+
+def manifest_mtime(directory: str) -> int:
+    try:
+        return os.stat(os.path.join(directory, MANIFEST_NAME)).st_mtime_ns
+    except OSError:
+        return 0
@@ -0,0 +1,128 @@
+import asyncio
+import glob
+import json
+import os
+import sys
+import pygame as p
+from chart_parser import load_chart
+from custom_chart import CustomChart
+from engine import init_audio
+from asset_manifest import assets
+from texture_cache import textures
+
+# Level loading
+# A level is a folder under levels/ with a chart, optionally a song, and the textures it needs.
+# level.json lists them (paths relative to the level folder); without it the folder is searched.
+# Loading runs as an asyncio task: file reads, chart parsing and image decoding happen on worker threads
+# (or in small steps in the browser, which has no threads), so the game loop keeps drawing meanwhile.
+
+AUDIO_EXTENSIONS = (".ogg", ".mp3", ".wav")
+MANIFEST_NAME = "level.json"
+
+
+class LevelManifest:
+    def __init__(self, directory: str, name: str, chart_path: str, audio_path: str = None, textures=()):
+        self.directory = directory
+        self.name = name
+        self.chart_path = chart_path
+        self.audio_path = audio_path
+        self.textures = list(textures)  # (path, width, height)
+
+
+def resolve_level(directory: str) -> LevelManifest:
+    def level_path(path):
+        # Same form as the paths sprites use, so texture cache keys match
+        return os.path.normpath(os.path.join(directory, path))
+
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as manifest_file:
+            data = json.load(manifest_file)
+        audio = data.get("audio")
+        return LevelManifest(directory, data.get("name", os.path.basename(directory)), level_path(data["chart"]),
+                             None if audio is None else level_path(audio),
+                             [(level_path(path), width, height) for path, width, height in data.get("textures", [])])
+
+    charts = sorted(glob.glob(os.path.join(directory, "*.txt")))
+    if not charts:
+        raise FileNotFoundError(f"no chart in {directory}")
+    songs = sorted(path for path in glob.glob(os.path.join(directory, "*")) if path.lower().endswith(AUDIO_EXTENSIONS))
+    return LevelManifest(directory, os.path.basename(directory), os.path.normpath(charts[0]),
+                         os.path.normpath(songs[0]) if songs else None)
+
+
+async def run_blocking(function, *args):
+    # Runs function on a worker thread, or straight away in the browser and then yields to the event loop
+    if sys.platform == "emscripten":
+        result = function(*args)
+        await asyncio.sleep(0)
+        return result
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+def read_file(path: str):
+    # Reading the song once pulls it into the OS file cache, so streaming it later doesn't wait on the disk
+    with open(path, "rb") as audio_file:
+        while audio_file.read(1024 * 1024):
+            pass
+
+
+class LevelLoad:
+    def __init__(self, manifest: LevelManifest):
+        self.manifest = manifest
+        self.steps_total = 1 + len(manifest.textures) + (manifest.audio_path is not None)
+        self.steps_done = 0
+        self.chart = None
+        self.timeline = None
+        self.error = None
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    @property
+    def progress(self) -> float:
+        return self.steps_done / self.steps_total
+
+    @property
+    def done(self) -> bool:
+        return self.task.done()
+
+    async def run(self):
+        manifest = self.manifest
+        try:
+            self.timeline = await run_blocking(load_chart, manifest.chart_path)
+            self.chart = CustomChart(manifest.chart_path, manifest.audio_path)
+            self.chart.timeline = self.timeline
+            self.steps_done += 1
+
+            for path, width, height in manifest.textures:
+                # Decode off the main thread, convert and scale on it (that needs the display)
+                baked = assets.image(path, width, height)
+                if baked is not None:
+                    surface = await run_blocking(p.image.load, baked[0])
+                    textures.add_source(path, surface, True, width, height, baked[1])
+                else:
+                    surface = await run_blocking(p.image.load, path)
+                    textures.add_source(path, surface)
+                    textures.preload(path, width, height)
+                self.steps_done += 1
+
+            if manifest.audio_path is not None:
+                # The audio device opens while the level loads rather than when the song starts
+                init_audio()
+                await run_blocking(read_file, self.chart.file_path)
+                self.steps_done += 1
+        except Exception as error:
+            # Kept for the loading screen to show instead of crashing the game loop
+            self.error = error
+
+
+class LevelLoader:
+    # Keeps one load per level, so picking a level early and then playing it only loads it once
+    def __init__(self):
+        self.loads = {}
+
+    def load(self, manifest: LevelManifest) -> LevelLoad:
+        level_load = self.loads.get(manifest.directory)
+        if level_load is None or level_load.error is not None:
+            level_load = LevelLoad(manifest)
+            self.loads[manifest.directory] = level_load
+        return level_load
@@ -0,0 +1,56 @@
+from sprite import Sprite
+
+# Meter
+# A bar that fills from the left as its value goes from 0 to maximum, e.g. health, loading or song progress.
+# The bar is drawn into one surface that is kept for good: when the value changes only the strip between
+# the old and new fill is filled in, and nothing is redrawn while the value stays put.
+# With a rate above 0 the fill slides towards the value instead of jumping, call update(dt) every frame for that.
+
+class Meter(Sprite):
+    def __init__(self, width, height, emp_r, emp_g, emp_b, x, y, full_r, full_g, full_b, maximum, rate: float = 0.0):
+        super().__init__(width, height, emp_r, emp_g, emp_b, x, y)
+        self.full_r = full_r
+        self.full_g = full_g
+        self.full_b = full_b
+        self.emp_r = emp_r
+        self.emp_g = emp_g
+        self.emp_b = emp_b
+        self.full_colour = (full_r, full_g, full_b)
+        self.empty_colour = (emp_r, emp_g, emp_b)
+        self.maximum = maximum
+        self.rate = rate  # how quickly the fill catches up, fraction of the gap per second
+        self._value = 0
+        self.shown = 0  # value the fill currently shows
+        self.drawn_width = 0  # filled pixels on the surface
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = max(0, min(self.maximum, value))
+        if self.rate <= 0:
+            self.shown = self._value
+
+    def update(self, dt):
+        super().update(dt)
+        # Slides the fill towards the value, snapping once it's less than half a pixel away
+        gap = self._value - self.shown
+        if gap != 0:
+            if abs(gap) / self.maximum * self.width < 0.5:
+                self.shown = self._value
+            else:
+                self.shown += gap * min(1.0, dt * self.rate)
+
+    def update_appearance(self) -> bool:
+        # Brings the surface up to date, returns whether anything had to be drawn
+        fill_width = int(self.shown / self.maximum * self.width + 0.5) if self.maximum > 0 else 0
+        if fill_width == self.drawn_width:
+            return False
+        if fill_width > self.drawn_width:
+            self.surface.fill(self.full_colour, (self.drawn_width, 0, fill_width - self.drawn_width, self.height))
+        else:
+            self.surface.fill(self.empty_colour, (fill_width, 0, self.drawn_width - fill_width, self.height))
+        self.drawn_width = fill_width
+        return True
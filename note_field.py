@@ -0,0 +1,92 @@
+from itertools import repeat
+from texture_cache import textures
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, NotePool is used without it
+    np = None
+
+# Note field
+# Stores every note as a row in a set of numpy arrays instead of as a Sprite object.
+# Moving and culling notes are array operations per frame, so stress charts with thousands of notes
+# on screen don't pay for a Python loop per note. Hits are judged by LaneJudge, not here.
+# Has the same spawn/release/update/draw methods as NotePool, handles are row numbers.
+
+class NoteField:
+    available = np is not None
+
+    def __init__(self, capacity: int, width: int, height: int, file_path: str):
+        if np is None:
+            raise ImportError("NoteField needs numpy")
+        self.width = width
+        self.height = height
+        self.surface = textures.get(file_path, width, height)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.velocity_x = np.zeros(capacity)
+        self.velocity_y = np.zeros(capacity)
+        self.lane = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.count = 0
+
+    def grow(self):
+        # Doubles every array, only happens if more notes are alive than the field was made for
+        capacity = len(self.x)
+        for name in ("x", "y", "velocity_x", "velocity_y", "lane", "alive"):
+            old = getattr(self, name)
+            new = np.zeros(capacity * 2, dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+        self.free.extend(range(capacity * 2 - 1, capacity - 1, -1))
+
+    def spawn(self, x, y, lane: int = 0, velocity_x=0.0, velocity_y=0.0) -> int:
+        if not self.free:
+            self.grow()
+        note = self.free.pop()
+        self.x[note] = x
+        self.y[note] = y
+        self.velocity_x[note] = velocity_x
+        self.velocity_y[note] = velocity_y
+        self.lane[note] = lane
+        self.alive[note] = True
+        self.count += 1
+        return note
+
+    def release(self, note: int):
+        if self.alive[note]:
+            self.alive[note] = False
+            self.free.append(note)
+            self.count -= 1
+
+    def release_all(self):
+        self.alive[:] = False
+        self.free = list(range(len(self.x) - 1, -1, -1))
+        self.count = 0
+
+    def update(self, dt):
+        # Dead rows move too - it's cheaper than masking and they're ignored everywhere else
+        self.x += self.velocity_x * dt
+        self.y += self.velocity_y * dt
+
+    def draw(self, renderer, time_offset=0.0, z=1):
+        # Each lane is one layer, culled and placed with array operations so only the final list is built in Python
+        # time_offset moves notes along their velocity when drawn, for interpolating between updates
+        xs = (self.x + self.velocity_x * time_offset).astype(int)
+        ys = (self.y + self.velocity_y * time_offset).astype(int)
+        for lane in np.unique(self.lane[self.alive]).tolist():
+            layer = renderer.layer((self, lane), z)
+            bounds = layer.bounds
+            visible = (self.alive & (self.lane == lane) & (xs < bounds.right) & (xs + self.width > bounds.left)
+                       & (ys < bounds.bottom) & (ys + self.height > bounds.top))
+            if not visible.any():
+                continue
+            lane_xs = xs[visible]
+            lane_ys = ys[visible]
+            left = int(lane_xs.min())
+            top = int(lane_ys.min())
+            area = (left, top, int(lane_xs.max()) + self.width - left, int(lane_ys.max()) + self.height - top)
+            layer.extend(zip(repeat(self.surface), zip(lane_xs.tolist(), lane_ys.tolist())), area)
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,90 @@
+from sprite import Sprite
+
+# Note pool
+# Every note sprite is made up front and shares the same cached texture.
+# Hit or missed notes go back into the pool to be reused instead of being thrown away.
+# Live notes are kept packed in a list - removing one swaps the last note into its place, so nothing shifts.
+
+class Note(Sprite):
+    __slots__ = ("slot", "lane")
+
+
+class NotePool:
+    def __init__(self, capacity: int, width: int, height: int, file_path: str):
+        self.width = width
+        self.height = height
+        self.file_path = file_path
+        self.active = []
+        self.free = []
+        for i in range(capacity):
+            self.free.append(self.new_note())
+
+    def new_note(self):
+        note = Note(self.width, self.height, 0, 0, 0, 0, 0, file_path=self.file_path)
+        note.slot = -1  # index in self.active while the note is alive
+        note.lane = 0
+        return note
+
+    def spawn(self, x, y, lane: int = 0, velocity_x=0, velocity_y=0):
+        # Takes a free note (only allocating if the pool has run dry) and places it at (x, y)
+        note = self.free.pop() if self.free else self.new_note()
+        note.position.set(x, y)
+        note.velocity.set(velocity_x, velocity_y)
+        note.lane = lane
+        note.slot = len(self.active)
+        self.active.append(note)
+        return note
+
+    def release(self, note):
+        # Swap the last live note into this one's slot, then drop the end of the list
+        slot = note.slot
+        last = self.active.pop()
+        if last is not note:
+            self.active[slot] = last
+            last.slot = slot
+        note.slot = -1
+        self.free.append(note)
+
+    def release_all(self):
+        for note in self.active:
+            note.slot = -1
+            self.free.append(note)
+        self.active.clear()
+
+    def update(self, dt):
+        for note in self.active:
+            note.update(dt)
+
+    def draw(self, renderer, time_offset=0.0, z=1):
+        # Each lane is one layer, drawn with a single blits call and without the notes that are off screen
+        # time_offset moves notes along their velocity when drawn, for interpolating between updates
+        lanes = {}
+        for note in self.active:
+            lane = lanes.get(note.lane)
+            if lane is None:
+                lane = lanes[note.lane] = []
+            lane.append((note.surface, (int(note.position.x + note.velocity.x * time_offset),
+                                        int(note.position.y + note.velocity.y * time_offset))))
+
+        # Every note is the same size, so culling and the covered area only need the positions
+        for lane, items in lanes.items():
+            layer = renderer.layer((self, lane), z)
+            bounds = layer.bounds
+            left = bounds.left - self.width
+            top = bounds.top - self.height
+            items = [item for item in items if left < item[1][0] < bounds.right and top < item[1][1] < bounds.bottom]
+            if items:
+                xs = [item[1][0] for item in items]
+                ys = [item[1][1] for item in items]
+                area = (min(xs), min(ys), max(xs) + self.width - min(xs), max(ys) + self.height - min(ys))
+                layer.extend(items, area)
+
+    def __len__(self):
+        return len(self.active)
+
+    def __iter__(self):
+        # Goes backwards so the note being looked at can be released during the loop
+        active = self.active
+        for i in range(len(active) - 1, -1, -1):
+            if i < len(active):
+                yield active[i]
@@ -0,0 +1,175 @@
+import json
+import os
+import time
+from collections import deque
+import pygame as p
+
+# Frame profiler
+# Times each phase of a frame (input, update, render...) and samples counters once a frame,
+# e.g. surfaces made, blits and disk loads. Counters are read from running totals kept where things happen:
+# everything that makes a surface or calls font.render adds to allocations, and the texture cache and
+# dirty renderer keep their own. Those are only adds, so nothing else is counted while profiling is off.
+# F3 in game shows an overlay with the phase times, counters and a graph of recent frame times.
+# With a trace path every frame is also kept as Chrome trace events (open in chrome://tracing or Perfetto).
+# While disabled every call returns straight away.
+
+GRAPH_FRAMES = 120
+GRAPH_HEIGHT = 60
+GRAPH_SCALE = 2  # pixels per millisecond
+TARGET_FRAME_MS = 1000 / 60
+OVERLAY_REFRESH = 30  # frames between updates of the overlay's numbers
+
+
+class Allocations:
+    # Running totals, added to right where surfaces are made and text is rendered
+    def __init__(self):
+        self.surfaces = 0
+        self.font_renders = 0
+
+
+# Shared by everything that makes surfaces
+allocations = Allocations()
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, trace_path: str = None, font=None, max_trace_frames: int = 20000):
+        self.trace_path = trace_path
+        self.overlay_visible = False
+        self.font = font
+        self.counters = {}  # name -> function returning a running total
+        self.totals = {}
+        self.frame_counts = {}  # how much each counter went up last frame
+        self.frame_start = 0
+        self.phase_name = None
+        self.phase_start = 0
+        self.phases = {}  # name -> ns spent this frame
+        self.last_phases = {}  # same for the last whole frame
+        self.frame_times = deque(maxlen=GRAPH_FRAMES)  # ms
+        self.trace = deque(maxlen=max_trace_frames * 8) if trace_path is not None else None
+        self.frames = 0
+        self.overlay = None
+        self.overlay_lines = []
+        self.enabled = False
+        if enabled or trace_path is not None:
+            self.enable()
+
+    @classmethod
+    def from_environment(cls, font=None):
+        # EPH_PROFILE=1 starts with the overlay up, EPH_TRACE=trace.json records a trace
+        profiler = cls(trace_path=os.environ.get("EPH_TRACE"), font=font)
+        if os.environ.get("EPH_PROFILE"):
+            profiler.enable()
+            profiler.overlay_visible = True
+        return profiler
+
+    def add_counter(self, name: str, total):
+        self.counters[name] = total
+        self.totals[name] = total()
+
+    def enable(self):
+        self.enabled = True
+        # Counting starts from now, not from whenever the counters were added
+        for name, total in self.counters.items():
+            self.totals[name] = total()
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        if self.overlay_visible:
+            self.enable()
+        elif self.trace is None:
+            self.enabled = False
+
+    def start_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = time.perf_counter_ns()
+        self.last_phases = self.phases
+        self.phases = {}
+        self.phase_name = None
+
+    def phase(self, name: str):
+        # Ends the phase that was running and starts timing this one
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.end_phase(now)
+        self.phase_name = name
+        self.phase_start = now
+
+    def end_phase(self, now: int):
+        if self.phase_name is None:
+            return
+        self.phases[self.phase_name] = self.phases.get(self.phase_name, 0) + now - self.phase_start
+        if self.trace is not None:
+            self.trace.append({"name": self.phase_name, "ph": "X", "pid": 0, "tid": 0,
+                               "ts": self.phase_start / 1000, "dur": (now - self.phase_start) / 1000})
+        self.phase_name = None
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.end_phase(now)
+        self.frames += 1
+        self.frame_times.append((now - self.frame_start) / 1_000_000)
+        for name, total in self.counters.items():
+            value = total()
+            self.frame_counts[name] = value - self.totals[name]
+            self.totals[name] = value
+        if self.trace is not None:
+            self.trace.append({"name": "frame", "ph": "X", "pid": 0, "tid": 1,
+                               "ts": self.frame_start / 1000, "dur": (now - self.frame_start) / 1000})
+            self.trace.append({"name": "counters", "ph": "C", "pid": 0, "tid": 0,
+                               "ts": self.frame_start / 1000, "args": dict(self.frame_counts)})
+
+    def draw(self, renderer, x: int = 10, y: int = 10):
+        # Puts the overlay on screen, call during the render phase
+        if not self.overlay_visible or self.font is None or not self.frame_times:
+            return
+        if self.overlay is None or self.frames % OVERLAY_REFRESH == 0:
+            self.overlay_lines = self.text_lines()
+        if self.overlay is None:
+            line_height = self.font.get_linesize()
+            self.overlay = p.Surface((max(GRAPH_FRAMES * 2, 360), GRAPH_HEIGHT + line_height * 3 + 8), p.SRCALPHA)
+            allocations.surfaces += 1
+        self.draw_overlay()
+        renderer.blit("profiler", self.overlay, (x, y), changed=True, z=10)
+
+    def text_lines(self):
+        frame_ms = sum(self.frame_times) / len(self.frame_times)
+        phases = "  ".join(f"{name} {ns / 1_000_000:.1f}" for name, ns in self.last_phases.items())
+        counters = "  ".join(f"{name} {count}" for name, count in self.frame_counts.items())
+        # The overlay's own text counts too
+        allocations.surfaces += 3
+        allocations.font_renders += 3
+        return [self.font.render(line, True, (255, 255, 255)) for line in
+                (f"{frame_ms:.2f} ms ({1000 / frame_ms:.0f} fps)" if frame_ms > 0 else "", phases, counters)]
+
+    def draw_overlay(self):
+        overlay = self.overlay
+        overlay.fill((0, 0, 0, 160))
+        text_y = 4
+        for line in self.overlay_lines:
+            overlay.blit(line, (4, text_y))
+            text_y += self.font.get_linesize()
+
+        # One bar per frame, red once it misses the 60 fps budget
+        bottom = overlay.get_height() - 2
+        for i, frame_ms in enumerate(self.frame_times):
+            height = min(GRAPH_HEIGHT, int(frame_ms * GRAPH_SCALE))
+            colour = (240, 80, 80) if frame_ms > TARGET_FRAME_MS else (120, 220, 120)
+            overlay.fill(colour, (i * 2, bottom - height, 2, height))
+        target_y = bottom - int(TARGET_FRAME_MS * GRAPH_SCALE)
+        overlay.fill((255, 255, 255), (0, target_y, overlay.get_width(), 1))
+
+    def save_trace(self):
+        # Writes the trace file if there is one, returns its path
+        if self.trace is None or not self.trace:
+            return None
+        try:
+            with open(self.trace_path, "w") as trace_file:
+                json.dump({"traceEvents": list(self.trace), "displayTimeUnit": "ms"}, trace_file)
+        except OSError as error:
+            print("couldn't save trace:", error)
+            return None
+        return self.trace_path
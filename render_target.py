@@ -0,0 +1,152 @@
+import math
+import weakref
+import pygame as p
+from profiler import allocations
+
+# Render target
+# The game is laid out in a fixed logical resolution (the window's starting size) and this maps it to
+# however big the window really is. The logical screen is fitted into the window keeping its shape,
+# with black bars filling the rest. Everything is drawn straight at the window's size: each surface is
+# scaled once and kept (so the background, buttons and note textures are only scaled again when the window
+# is resized), and surfaces that get redrawn in place are scaled again when they change.
+# At the starting size nothing is scaled at all.
+# With dynamic resolution the game draws into a smaller surface while frames take longer than their budget,
+# and that is stretched to the window, only where something changed. It goes back up once there's time again.
+
+QUALITY_STEPS = (1.0, 0.75, 0.5)
+ADAPT_FRAMES = 120  # frames to wait after a change before judging the frame time again
+
+
+class RenderTarget:
+    def __init__(self, window, dynamic_resolution: bool = False):
+        self.window = window
+        self.dynamic_resolution = dynamic_resolution
+        self.step = 0  # index into QUALITY_STEPS
+        self.average = None  # recent seconds of work per frame
+        self.frames_since_change = 0
+        self.surface = None  # what gets drawn on
+        self.scale = 1.0  # target pixels per logical pixel
+        self.identity = True  # drawing straight onto the window at the logical size
+        self.offscreen = False  # drawing into a smaller surface that gets stretched to the window
+        self.display_size = None
+        self.stale = True
+        self.scaled_surfaces = weakref.WeakKeyDictionary()  # logical surface -> scaled copy
+
+    def refresh(self) -> bool:
+        # Rebuilds the target if the window changed size or the quality changed, True if it did
+        display = p.display.get_surface()
+        if not self.stale and display is self.window.window and display.get_size() == self.display_size:
+            return False
+        self.stale = False
+        self.display_size = display.get_size()
+        self.window.update_viewport()
+        viewport = self.window.viewport
+        quality = QUALITY_STEPS[self.step]
+        self.scale = self.window.scale * quality
+        self.offscreen = quality < 1.0
+        self.identity = not self.offscreen and self.scale == 1.0 and viewport == display.get_rect()
+        if self.offscreen:
+            width, height = self.window.logical_size
+            size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+            self.surface = p.Surface(size).convert()
+            allocations.surfaces += 2
+        elif viewport == display.get_rect():
+            self.surface = display
+        else:
+            self.surface = display.subsurface(viewport)
+        self.scaled_surfaces.clear()
+        return True
+
+    def scaled(self, surface):
+        if self.identity:
+            return surface
+        scaled = self.scaled_surfaces.get(surface)
+        if scaled is None:
+            width, height = surface.get_size()
+            size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+            # smoothscale only takes 24 and 32 bit surfaces, e.g. not text rendered without antialiasing
+            if surface.get_bitsize() >= 24:
+                scaled = p.transform.smoothscale(surface, size)
+            else:
+                scaled = p.transform.scale(surface, size)
+            allocations.surfaces += 1
+            self.scaled_surfaces[surface] = scaled
+        return scaled
+
+    def forget(self, surface):
+        # For surfaces that were redrawn in place, they're scaled again next time they're drawn
+        self.scaled_surfaces.pop(surface, None)
+
+    def map_items(self, items):
+        # (surface, logical position) pairs to draw on the target
+        if self.identity:
+            return items
+        scale = self.scale
+        scaled = self.scaled
+        return [(scaled(surface), (round(position[0] * scale), round(position[1] * scale)))
+                for surface, position in items]
+
+    def map_rect(self, rect):
+        # The target pixels covering a logical rect, rounded outwards
+        if self.identity:
+            return rect
+        scale = self.scale
+        left = math.floor(rect.left * scale) - 1
+        top = math.floor(rect.top * scale) - 1
+        right = math.ceil(rect.right * scale) + 1
+        bottom = math.ceil(rect.bottom * scale) + 1
+        return p.Rect(left, top, right - left, bottom - top).clip(self.surface.get_rect())
+
+    def show(self, areas):
+        # Puts these areas of the target on the display
+        viewport = self.window.viewport
+        if not self.offscreen:
+            p.display.update([area.move(viewport.topleft) for area in areas])
+            return
+        display = self.window.window
+        x_scale = viewport.width / self.surface.get_width()
+        y_scale = viewport.height / self.surface.get_height()
+        updated = []
+        for area in areas:
+            left = viewport.x + math.floor(area.left * x_scale)
+            top = viewport.y + math.floor(area.top * y_scale)
+            size = (viewport.x + math.ceil(area.right * x_scale) - left,
+                    viewport.y + math.ceil(area.bottom * y_scale) - top)
+            display.blit(p.transform.scale(self.surface.subsurface(area), size), (left, top))
+            allocations.surfaces += 1
+            updated.append(p.Rect((left, top), size))
+        p.display.update(updated)
+
+    def show_all(self):
+        display = self.window.window
+        viewport = self.window.viewport
+        if self.offscreen:
+            p.transform.scale(self.surface, viewport.size, display.subsurface(viewport))
+        if viewport != display.get_rect():
+            # Black bars either side of the logical screen
+            width, height = display.get_size()
+            display.fill((0, 0, 0), (0, 0, width, viewport.top))
+            display.fill((0, 0, 0), (0, viewport.bottom, width, height - viewport.bottom))
+            display.fill((0, 0, 0), (0, 0, viewport.left, height))
+            display.fill((0, 0, 0), (viewport.right, 0, width - viewport.right, height))
+        p.display.flip()
+
+    def frame_time(self, seconds: float, budget: float):
+        # Call once a frame with how long the frame's work took, for dynamic resolution
+        if not self.dynamic_resolution:
+            return
+        self.average = seconds if self.average is None else self.average * 0.9 + seconds * 0.1
+        self.frames_since_change += 1
+        if self.frames_since_change < ADAPT_FRAMES:
+            return
+        quality = QUALITY_STEPS[self.step]
+        if self.average > budget * 0.9 and self.step < len(QUALITY_STEPS) - 1:
+            self.step += 1
+        # Drawing costs about the number of pixels, so only go up if the bigger size should still fit
+        elif self.step > 0 and self.average * (QUALITY_STEPS[self.step - 1] / quality) ** 2 < budget * 0.75:
+            self.step -= 1
+        else:
+            return
+        self.frames_since_change = 0
+        self.average = None
+        self.stale = True
@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Replays
+# While playing, InputRecorder logs every key and mouse press with the song time it happened at
+# and how many ticks the session had run by then.
+# replay() runs the same chart and presses through a GameSession with no window, sound or frame clock,
+# ticking as fast as the CPU allows, and gives the same score as the run that was recorded.
+# Run this file on a list of replay logs to re-score them in bulk, e.g. on a server without a display.
+
+from chart_parser import load_chart
+from game_loop import FixedTimestep
+from gameplay import GameSession, input_lane
+from hit_judge import HitWindow
+
+REPLAY_VERSION = 2
+REPLAY_DIRECTORY = "replays"
+
+
+class InputRecorder:
+    def __init__(self, chart_path: str, session: GameSession, tick_rate: int):
+        self.chart_path = chart_path
+        self.session = session
+        self.tick_rate = tick_rate
+        self.start_time = session.song_time
+        self.events = []  # [song time, "key" or "mouse", key or button, session ticks]
+
+    def record(self, song_time: float, kind: str, code: int):
+        self.events.append([song_time, kind, code, self.session.ticks])
+
+    def log(self) -> dict:
+        session = self.session
+        window = session.judge.window
+        return {
+            "version": REPLAY_VERSION,
+            "chart": self.chart_path,
+            "tick_rate": self.tick_rate,
+            "travel_time": session.travel_time,
+            "hit_window": [window.perfect, window.good, window.miss],
+            "max_health": session.max_health,
+            "start_time": self.start_time,
+            "events": self.events,
+            "score": session.score,
+            "judgements": session.judgements,
+        }
+
+    def save(self, directory: str = REPLAY_DIRECTORY):
+        # Returns where the replay went, or None if it couldn't be written (e.g. a read-only install)
+        path = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}.json")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, "w") as replay_file:
+                json.dump(self.log(), replay_file)
+        except OSError:
+            return None
+        return path
+
+
+def load_replay(path: str) -> dict:
+    with open(path, "r") as replay_file:
+        log = json.load(replay_file)
+    if log.get("version") != REPLAY_VERSION:
+        raise ValueError(f"{path}: unsupported replay version {log.get('version')}")
+    return log
+
+
+def replay(log: dict, timeline=None) -> GameSession:
+    # Plays the log back and returns the finished session
+    if timeline is None:
+        timeline = load_chart(log["chart"])
+    session = GameSession(timeline, log["travel_time"], HitWindow(*log["hit_window"]),
+                          max_health=log["max_health"])
+    session.start(log["start_time"])
+    # Same tick length as the game used, so song_time adds up to exactly the same numbers
+    dt = FixedTimestep(log["tick_rate"]).dt
+
+    for song_time, kind, code, ticks in log["events"]:
+        # Every tick the game had run before the press (it caught up to the song first), then the press itself.
+        # Going by the tick count keeps this exact even when a resynced song left the game ahead of the press
+        while not session.over and session.ticks < ticks:
+            session.tick(dt)
+        lane = input_lane(kind, code)
+        if lane is not None:
+            session.press(lane, song_time)
+
+    # Then the rest of the chart with no more presses
+    end_time = timeline.end_time + session.travel_time + session.judge.window.miss
+    while not session.over and session.song_time <= end_time:
+        session.tick(dt)
+    return session
+
+
+def check(path: str):
+    # Returns (path, replayed score, recorded score), or (path, error, recorded score)
+    try:
+        log = load_replay(path)
+        return path, replay(log).score, log.get("score")
+    except (OSError, ValueError, KeyError) as error:
+        return path, str(error), None
+
+
+def main(arguments=None) -> int:
+    # Nothing here opens a window or plays sound, but keep SDL off real devices if anything starts it
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    parser = argparse.ArgumentParser(description="re-score eph replays without a window")
+    parser.add_argument("replays", nargs="+", help="replay logs to score")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="replays to score at once")
+    options = parser.parse_args(arguments)
+
+    started = time.perf_counter()
+    if options.jobs > 1:
+        from multiprocessing import Pool
+        with Pool(options.jobs) as pool:
+            results = pool.map(check, options.replays, chunksize=16)
+    else:
+        results = [check(path) for path in options.replays]
+
+    mismatches = 0
+    for path, score, recorded in results:
+        if isinstance(score, str):
+            print(f"{path}: error: {score}")
+            mismatches += 1
+        elif recorded is not None and score != recorded:
+            print(f"{path}: score {score}, recorded {recorded} - MISMATCH")
+            mismatches += 1
+        else:
+            print(f"{path}: score {score}")
+    print(f"{len(results)} replays in {time.perf_counter() - started:.2f}s, {mismatches} mismatched")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# Scenes
+# Each screen of the game (title, gameplay, pause...) is a Scene that owns its objects and handles its own
+# input, update and drawing. The SceneManager only runs the scene on top of its stack, so scenes underneath
+# or not on the stack cost nothing. Pushing a scene over another (pause over gameplay) keeps the one below
+# as it was, and its pause()/resume() are where it freezes and restarts its clocks.
+
+class Scene:
+    # Frame rate that's enough while this scene is up, None for as fast as possible. Menus don't animate much,
+    # and scenes with one also let the frame pacer drop lower still while nothing on screen changes
+    idle_fps = None
+
+    def __init__(self, background=None):
+        self.background = background  # drawn under the scene, should cover the whole window
+
+    def enter(self):
+        # Became the top scene by being switched to or pushed
+        pass
+
+    def leave(self):
+        # Taken off the stack
+        pass
+
+    def pause(self):
+        # Another scene was pushed over this one
+        pass
+
+    def resume(self):
+        # The scene over this one was popped
+        pass
+
+    def handle_event(self, event):
+        pass
+
+    def update(self, dt: float):
+        pass
+
+    def render(self, renderer):
+        pass
+
+
+class SceneManager:
+    def __init__(self):
+        self.stack = []
+
+    @property
+    def top(self) -> Scene:
+        return self.stack[-1] if self.stack else None
+
+    def switch(self, scene: Scene):
+        # Replaces every scene on the stack with this one
+        while self.stack:
+            self.stack.pop().leave()
+        self.stack.append(scene)
+        scene.enter()
+
+    def push(self, scene: Scene):
+        if self.stack:
+            self.stack[-1].pause()
+        self.stack.append(scene)
+        scene.enter()
+
+    def pop(self):
+        self.stack.pop().leave()
+        if self.stack:
+            self.stack[-1].resume()
+
+    def handle_event(self, event):
+        if self.stack:
+            self.stack[-1].handle_event(event)
+
+    def update(self, dt: float):
+        if self.stack:
+            self.stack[-1].update(dt)
+
+    def render(self, renderer):
+        # Anything the last scene drew that this one doesn't gets cleared by the renderer
+        scene = self.top
+        if scene is None:
+            return
+        renderer.set_background(scene.background)
+        scene.render(renderer)
+
+    def idle_fps(self):
+        scene = self.top
+        return None if scene is None else scene.idle_fps
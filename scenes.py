@@ -0,0 +1,452 @@
+import asyncio
+import pygame as p
+from scene import Scene, SceneManager
+from sprite import Sprite
+from label import Label
+from button import Button
+from health_bar import HealthBar
+from meter import Meter
+from texture_cache import textures
+from profiler import allocations
+from note_pool import NotePool
+from note_field import NoteField
+from gameplay import GameSession, input_lane
+from glyph_atlas import CachedText
+from game_loop import FixedTimestep
+from song_clock import SongClock
+from level_loader import LevelLoader, resolve_level, run_blocking
+from level_catalog import LevelCatalog, SORT_COLUMNS
+
+# The game's screens
+# Game holds what the scenes share (the font, the picked level and its load) and makes every scene once.
+# Scenes move between each other through game.scenes:
+#   title -> loading -> gameplay -> game over,  gameplay <-> pause,  title <-> level select / exit confirm
+
+
+class Game:
+    def __init__(self, renderer, profiler, font, background, audio_latency: float = 0.0):
+        self.renderer = renderer
+        self.profiler = profiler
+        self.font = font
+        self.background = background
+        # Seconds the speakers lag behind the mixer, raise it if notes feel early
+        self.audio_latency = audio_latency
+        self.scenes = SceneManager()
+
+        # The level's chart, song and textures load in the background while the menu is up
+        self.level_loader = LevelLoader()
+        self.level = resolve_level("levels/level1")
+        self.level_load = self.level_loader.load(self.level)
+
+        self.title = TitleScene(self)
+        self.loading = LoadingScene(self)
+        self.gameplay = GameplayScene(self)
+        self.pause_menu = PauseScene(self)
+        self.level_select = LevelSelectScene(self)
+        self.exit_confirm = ExitConfirmScene(self)
+        self.game_over = GameOverScene(self)
+        self.scenes.switch(self.title)
+
+    def select_level(self, directory: str):
+        # Starts loading the level straight away so it's ready by the time play is pressed
+        self.level = resolve_level(directory)
+        self.level_load = self.level_loader.load(self.level)
+
+    def save_trace(self):
+        trace_path = self.profiler.save_trace()
+        if trace_path is not None:
+            print("trace saved to", trace_path)
+
+    def quit(self):
+        session = self.gameplay.session
+        if session is not None:
+            print("you scored", str(session.score))
+        print("textures:", textures.stats())
+        song = None if self.gameplay.chart is None else self.gameplay.chart.stats()
+        if song is not None:
+            print("song:", song)
+        self.save_trace()
+        p.quit()
+        exit(0)
+
+
+def clicked(event):
+    return event.type == p.MOUSEBUTTONDOWN and event.button == p.BUTTON_LEFT
+
+
+class TitleScene(Scene):
+    idle_fps = 30
+
+    def __init__(self, game: Game):
+        super().__init__(game.background)
+        self.game = game
+        font = game.font
+        self.orph = Sprite(300, 300, 255, 255, 255, 600, 300, file_path="assets/orph-default.png")
+        self.game_title = Label(800, 150, 255, 255, 255, 100, 60, "eph :3", font, background="assets/button bg.png")
+        self.mode_1 = Button(200, 100, 255, 255, 255, 300, 300, "play :3", font, background="assets/button bg.png")
+        self.exit_button = Button(150, 100, 255, 255, 255, 350, 450, "exit :(", font,
+                                  background="assets/button bg.png")
+        self.level_select_menu_button = Button(150, 100, 255, 255, 255, 350, 600, "level select", font,
+                                               background="assets/button bg.png")
+        self.selected_level_button = Button(150, 100, 255, 255, 255, 525, 600, "e", font,
+                                            background="assets/button bg.png")
+        self.shown_level = None
+
+    def enter(self):
+        if self.shown_level is not self.game.level:
+            self.shown_level = self.game.level
+            self.selected_level_button.set_text(self.game.level.name)
+
+    def handle_event(self, event):
+        if not clicked(event):
+            return
+        mouse_x, mouse_y = event.pos
+        if self.mode_1.mouse_touching(mouse_x, mouse_y):
+            # Goes straight into the game once the level has finished loading
+            self.game.scenes.switch(self.game.loading)
+        elif self.exit_button.mouse_touching(mouse_x, mouse_y):
+            self.game.scenes.switch(self.game.exit_confirm)
+        elif self.level_select_menu_button.mouse_touching(mouse_x, mouse_y):
+            self.game.scenes.switch(self.game.level_select)
+
+    def render(self, renderer):
+        renderer.draw(self.game_title)
+        renderer.draw(self.mode_1)
+        renderer.draw(self.exit_button)
+        renderer.draw(self.orph)
+        renderer.draw(self.level_select_menu_button)
+        renderer.draw(self.selected_level_button)
+
+
+class LoadingScene(Scene):
+    idle_fps = 60
+
+    def __init__(self, game: Game):
+        super().__init__(game.background)
+        self.game = game
+        self.loading_text = CachedText(game.font, (255, 255, 255), False)
+        self.loading_label = None
+        self.loading_bar = Meter(400, 25, 255, 255, 255, 300, 400, 179, 229, 252, 1, rate=8.0)
+
+    def handle_event(self, event):
+        if event.type == p.KEYDOWN and event.key == p.K_ESCAPE:
+            self.game.scenes.switch(self.game.title)
+
+    def update(self, dt: float):
+        game = self.game
+        load = game.level_load
+        self.loading_bar.value = load.progress
+        self.loading_bar.update(dt)
+        if load.error is not None:
+            self.loading_label = self.loading_text.set(f"couldn't load {game.level.name} :(")
+        elif load.done:
+            game.scenes.switch(game.gameplay)
+        else:
+            self.loading_label = self.loading_text.set(f"loading {game.level.name}... {int(load.progress * 100)}%")
+
+    def render(self, renderer):
+        if self.loading_label is not None:
+            renderer.blit("loading", self.loading_label, (300, 350))
+        renderer.draw(self.loading_bar, changed=self.loading_bar.update_appearance())
+
+
+class GameplayScene(Scene):
+    def __init__(self, game: Game):
+        super().__init__(game.background)
+        self.game = game
+        font = game.font
+        self.tap_line = Sprite(35, 350, 255, 255, 255, 50, 0)
+        self.tap_line_2 = Sprite(35, 350, 255, 255, 255, 50, 370)
+        # Only laid out again when the numbers change
+        self.score_label = CachedText(font, (255, 255, 255), False)
+        self.mult_text = CachedText(font, (255, 255, 255), False)
+        self.health_bar = HealthBar(200, 25, 255, 255, 255, 750, 50, 179, 229, 252, 100)
+        self.song_progress = Meter(1000, 6, 255, 255, 255, 0, 714, 179, 229, 252, 1)
+        # Notes should be hit when their centre crosses the centre of the tap line
+        hit_x = self.tap_line.position.x + self.tap_line.width / 2 - 50
+        self.travel_time = (1000 - hit_x) / 800
+
+        self.chart = None
+        self.timeline = None
+        self.session = None
+        self.recorder = None
+        self.song_clock = None
+        self.game_loop = None
+        self.notes = None
+
+    def setup_level(self, load):
+        self.chart = load.chart
+        self.timeline = load.timeline
+
+        # Gameplay ticks follow the song, so spawns and judgement stay locked to the music
+        self.song_clock = SongClock(self.chart, latency=self.game.audio_latency)
+        self.game_loop = FixedTimestep(120, clock=self.song_clock.time_ns, drop_excess=False)
+
+        # Every note shares the shark texture, which the loader already decoded
+        # Notes take (1000 + 100) / 800 seconds to cross the screen - stress charts with lots on screen at once use numpy
+        peak_notes = self.timeline.peak_notes(1100 / 800)
+        if NoteField.available and peak_notes >= 500:
+            self.notes = NoteField(peak_notes, 100, 100, "assets/shark.png")
+        else:
+            self.notes = NotePool(max(peak_notes, 16), 100, 100, "assets/shark.png")
+
+        # bg has transparent bits, so bake it over the window colour once instead of every frame
+        bg = Sprite(1000, 720, 0, 0, 0, 0, 0, file_path="assets/bg.png")
+        self.background = self.game.background.copy()
+        allocations.surfaces += 1
+        self.background.blit(bg.surface, (0, 0))
+
+        # Scoring, health and judgement live in the session, so runs can be replayed without a window
+        self.session = GameSession(self.timeline, self.travel_time, notes=self.notes,
+                                   max_health=self.health_bar.max_health)
+
+    def enter(self):
+        # From loading or retry, the level's load has finished by now
+        load = self.game.level_load
+        if self.chart is not load.chart:
+            self.setup_level(load)
+        self.song_clock.play()
+        self.game_loop.reset()
+        self.session.start(self.song_clock.time())
+        # Replays aren't needed until the first run starts, so they're not imported at startup
+        from replay import InputRecorder
+        self.recorder = InputRecorder(self.game.level.chart_path, self.session, self.game_loop.tick_rate)
+
+    def leave(self):
+        self.song_clock.stop()
+
+    def pause(self):
+        # Nothing moves while paused, the song time picks up where it stopped
+        self.song_clock.pause()
+
+    def resume(self):
+        self.song_clock.resume()
+
+    def finish(self):
+        print("you scored", str(self.session.score))
+        self.song_clock.stop()
+        replay_path = self.recorder.save()
+        if replay_path is not None:
+            print("replay saved to", replay_path)
+
+    def press(self, kind, code):
+        # Every press is recorded with its song time, whether it hits a lane or not.
+        # The session catches up to the song first, so the press is judged against the same notes a replay sees
+        song_time = self.song_clock.time()
+        self.game_loop.consume(self.session.catch_up(song_time, self.game_loop.dt))
+        self.recorder.record(song_time, kind, code)
+        lane = input_lane(kind, code)
+        if lane is not None:
+            judgement = self.session.press(lane, song_time)
+            if judgement is not None:
+                print(judgement)
+
+    def handle_event(self, event):
+        if event.type == p.KEYDOWN:
+            self.press("key", event.key)
+            if event.key == p.K_ESCAPE:
+                self.game.scenes.push(self.game.pause_menu)
+        elif event.type == p.MOUSEBUTTONDOWN:
+            self.press("mouse", event.button)
+
+    def update(self, dt: float):
+        # The simulation moves in fixed ticks however long the frame took
+        self.song_clock.sync()
+        steps = self.game_loop.advance()
+        for step in range(steps):
+            self.session.tick(self.game_loop.dt)
+
+        if self.session.over:  # chart finished or health ran out
+            self.finish()
+            self.game.scenes.switch(self.game.game_over)
+            return
+
+        self.health_bar.current_health = self.session.health
+        self.health_bar.update(dt)
+        if self.timeline.end_time > 0:
+            self.song_progress.value = self.session.song_time / self.timeline.end_time
+
+    def render(self, renderer):
+        renderer.blit("score", self.score_label.set("score: " + str(self.session.score)), (775, 125))
+        renderer.blit("mult", self.mult_text.set(f"multiplier: {self.session.mult}"), (775, 160))
+        # Bars only redraw the part that changed, and tell the renderer when they did
+        renderer.draw(self.health_bar, changed=self.health_bar.update_appearance())
+        renderer.draw(self.song_progress, changed=self.song_progress.update_appearance())
+        renderer.draw(self.tap_line)
+        renderer.draw(self.tap_line_2)
+        self.notes.draw(renderer, self.game_loop.render_offset())
+
+
+class PauseScene(Scene):
+    idle_fps = 30
+
+    def __init__(self, game: Game):
+        super().__init__(game.background)
+        self.game = game
+        self.pause_label = Label(650, 200, 255, 255, 255, 100, 255, "pause", game.font,
+                                 background="assets/button bg.png")
+        self.orph = Sprite(300, 300, 255, 255, 255, 600, 300, file_path="assets/orph-default.png")
+
+    def handle_event(self, event):
+        if event.type == p.KEYDOWN and event.key == p.K_ESCAPE:
+            self.game.scenes.pop()
+
+    def render(self, renderer):
+        renderer.draw(self.pause_label)
+        renderer.draw(self.orph)
+
+
+class LevelSelectScene(Scene):
+    idle_fps = 30
+    levels_per_page = 5
+    level_filters = [("all", None, None), ("chill", None, 2), ("normal", 2, 5), ("hard", 5, None)]
+
+    def __init__(self, game: Game):
+        super().__init__(game.background)
+        self.game = game
+        font = game.font
+        # The catalog index is brought up to date in the background, only changed charts get parsed
+        self.catalog = LevelCatalog("levels")
+        self.catalog_refresh = asyncio.get_running_loop().create_task(run_blocking(self.catalog.refresh))
+        self.level_sort = 0
+        self.level_filter = 0
+        self.level_page = 0
+        self.level_list = []
+        self.sort_button = Button(200, 60, 255, 255, 255, 100, 40, "sort: name", font,
+                                  background="assets/button bg.png", command=self.change_sort)
+        self.filter_button = Button(200, 60, 255, 255, 255, 325, 40, "show: all", font,
+                                    background="assets/button bg.png", command=self.change_filter)
+        self.more_button = Button(150, 60, 255, 255, 255, 550, 40, "more", font,
+                                  background="assets/button bg.png", command=self.next_page)
+        self.back_button = Button(150, 60, 255, 255, 255, 725, 40, "back", font,
+                                  background="assets/button bg.png", command=self.leave_level_select)
+
+    def enter(self):
+        self.check_refresh()
+        self.show_levels()
+
+    def check_refresh(self):
+        # True once the index has just finished updating
+        if self.catalog_refresh is None or not self.catalog_refresh.done():
+            return False
+        error = self.catalog_refresh.exception()
+        self.catalog_refresh = None
+        if error is not None:
+            print("couldn't index levels:", error)
+            return False
+        return True
+
+    def show_levels(self):
+        # Rebuilds the level buttons for the current sort, filter and page
+        name, min_density, max_density = self.level_filters[self.level_filter]
+        if self.level_page * self.levels_per_page >= max(1, self.catalog.count(min_density, max_density)):
+            self.level_page = 0
+        self.level_list.clear()
+        for i, info in enumerate(self.catalog.levels(SORT_COLUMNS[self.level_sort], self.level_sort > 0,
+                                                     min_density, max_density, self.levels_per_page,
+                                                     self.level_page * self.levels_per_page)):
+            text = f"{info.name} - {info.note_count} notes - {info.bpm:g} bpm - {info.density:.1f}/s"
+            self.level_list.append(Button(600, 80, 255, 255, 255, 200, 150 + i * 100, text, self.game.font,
+                                          background="assets/button bg.png",
+                                          command=lambda info=info: self.select_level(info)))
+
+    def select_level(self, info):
+        self.game.select_level(info.directory)
+        self.game.scenes.switch(self.game.title)
+
+    def change_sort(self):
+        self.level_sort = (self.level_sort + 1) % len(SORT_COLUMNS)
+        self.sort_button.set_text("sort: " + SORT_COLUMNS[self.level_sort].replace("_", " "))
+        self.show_levels()
+
+    def change_filter(self):
+        self.level_filter = (self.level_filter + 1) % len(self.level_filters)
+        self.level_page = 0
+        self.filter_button.set_text("show: " + self.level_filters[self.level_filter][0])
+        self.show_levels()
+
+    def next_page(self):
+        self.level_page += 1
+        self.show_levels()
+
+    def leave_level_select(self):
+        self.game.scenes.switch(self.game.title)
+
+    def handle_event(self, event):
+        if event.type == p.KEYDOWN and event.key == p.K_ESCAPE:
+            self.leave_level_select()
+        elif clicked(event):
+            mouse_x, mouse_y = event.pos
+            for button in [self.sort_button, self.filter_button, self.more_button, self.back_button] + self.level_list:
+                if button.mouse_touching(mouse_x, mouse_y):
+                    button.button_clicked()
+                    break
+
+    def update(self, dt: float):
+        if self.check_refresh():
+            self.show_levels()
+
+    def render(self, renderer):
+        renderer.draw(self.sort_button)
+        renderer.draw(self.filter_button)
+        renderer.draw(self.more_button)
+        renderer.draw(self.back_button)
+        for button in self.level_list:
+            renderer.draw(button)
+
+
+class ExitConfirmScene(Scene):
+    idle_fps = 30
+
+    def __init__(self, game: Game):
+        super().__init__(game.background)
+        self.game = game
+        self.exit_return = Button(150, 100, 255, 255, 255, 350, 450, "nevermind", game.font,
+                                  background="assets/button bg.png")
+        self.exit_confirm = Button(150, 100, 255, 255, 255, 350, 200, "exit :(", game.font,
+                                   background="assets/button bg.png")
+
+    def handle_event(self, event):
+        if not clicked(event):
+            return
+        mouse_x, mouse_y = event.pos
+        if self.exit_confirm.mouse_touching(mouse_x, mouse_y):
+            self.game.quit()
+        elif self.exit_return.mouse_touching(mouse_x, mouse_y):
+            self.game.scenes.switch(self.game.title)
+
+    def render(self, renderer):
+        renderer.draw(self.exit_confirm)
+        renderer.draw(self.exit_return)
+
+
+class GameOverScene(Scene):
+    idle_fps = 30
+
+    def __init__(self, game: Game):
+        super().__init__(game.background)
+        self.game = game
+        self.win = game.font.render("you win!", False, (255, 255, 255))
+        self.lose = game.font.render("you lose :(", False, (255, 255, 255))
+        allocations.surfaces += 2
+        allocations.font_renders += 2
+        self.retry_button = Button(150, 100, 255, 255, 255, 350, 200, "retry", game.font,
+                                   background="assets/button bg.png")
+        self.menu_button = Button(150, 100, 255, 255, 255, 350, 400, "menu", game.font,
+                                  background="assets/button bg.png")
+
+    def handle_event(self, event):
+        if not clicked(event):
+            return
+        mouse_x, mouse_y = event.pos
+        if self.retry_button.mouse_touching(mouse_x, mouse_y):
+            self.game.scenes.switch(self.game.gameplay)
+        elif self.menu_button.mouse_touching(mouse_x, mouse_y):
+            self.game.scenes.switch(self.game.title)
+
+    def render(self, renderer):
+        # won is only set when the chart ran out, not when health did
+        result = self.win if self.game.gameplay.session.won else self.lose
+        renderer.blit("result", result, (50, 50))
+        renderer.draw(self.retry_button)
+        renderer.draw(self.menu_button)
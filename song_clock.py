@@ -0,0 +1,92 @@
+import time
+import pygame as p
+from engine import init_audio
+
+# Song clock
+# Plays a StreamingAudio track (e.g. a CustomChart) and keeps track of where in the song we are.
+# Between frames the time runs off the performance counter, and once a frame its speed is nudged
+# towards the position the mixer reports (which only moves in whole audio buffers), so it never runs backwards.
+# Big jumps (a stalled mixer, a long hitch) are snapped to straight away.
+# latency is how long the speakers are behind the mixer - raise it if notes feel early.
+
+class SongClock:
+    def __init__(self, track=None, latency: float = 0.0, correction: float = 2.0,
+                 max_slew: float = 0.05, resync_threshold: float = 0.1):
+        self.track = track
+        self.latency = latency
+        self.correction = correction  # how hard drift is corrected, speed change per second of drift
+        self.max_slew = max_slew  # the clock never runs more than this much faster or slower than real time
+        self.resync_threshold = resync_threshold
+        self.has_audio = False
+        self.playing = False
+        self.position = 0.0  # song time at anchor_ns
+        self.anchor_ns = time.perf_counter_ns()
+        self.rate = 1.0
+        self.start_position = 0.0
+        self.drift = 0.0
+
+    def play(self, start: float = 0.0):
+        self.has_audio = False
+        if self.track is not None and self.track.file_path is not None and init_audio():
+            try:
+                self.track.play(start=start)
+                self.has_audio = True
+            except p.error:
+                # No audio device or unsupported file - the song time still runs off the frame clock
+                pass
+        self.start_position = start
+        self.position = start
+        self.anchor_ns = time.perf_counter_ns()
+        self.rate = 1.0
+        self.playing = True
+
+    def pause(self):
+        if self.playing:
+            self.position = self.frame_time()
+            self.playing = False
+            if self.has_audio:
+                self.track.pause()
+
+    def resume(self):
+        if not self.playing:
+            self.anchor_ns = time.perf_counter_ns()
+            self.playing = True
+            if self.has_audio:
+                self.track.unpause()
+
+    def stop(self):
+        self.pause()
+        if self.has_audio:
+            self.track.stop()
+            self.has_audio = False
+
+    def frame_time(self) -> float:
+        if not self.playing:
+            return self.position
+        return self.position + (time.perf_counter_ns() - self.anchor_ns) / 1_000_000_000 * self.rate
+
+    def sync(self):
+        # Call once per frame to pull the clock towards the mixer
+        if not self.playing or not self.has_audio:
+            return
+        position_ms = self.track.get_pos()
+        if position_ms < 0:
+            return
+        audio_time = self.start_position + position_ms / 1000
+        now = time.perf_counter_ns()
+        current = self.position + (now - self.anchor_ns) / 1_000_000_000 * self.rate
+        self.drift = audio_time - current
+        if abs(self.drift) > self.resync_threshold:
+            current = audio_time
+            self.rate = 1.0
+        else:
+            self.rate = 1.0 + max(-self.max_slew, min(self.max_slew, self.drift * self.correction))
+        self.position = current
+        self.anchor_ns = now
+
+    def time(self) -> float:
+        # Song time in seconds as the player hears it
+        return self.frame_time() - self.latency
+
+    def time_ns(self) -> int:
+        return int(self.time() * 1_000_000_000)
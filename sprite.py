@@ -1,7 +1,12 @@
 from vector import Vector
+from texture_cache import textures
+from profiler import allocations
 import pygame as p
 
 class Sprite:
+    # Subclasses without __slots__ still get a __dict__ for their own attributes
+    __slots__ = ("surface", "position", "velocity", "width", "height")
+
     def does_collide(sprite1: "Sprite", sprite2: "Sprite"):
         return (sprite1.get_left() <= sprite2.get_right() and
                 sprite1.get_right() >= sprite2.get_left() and
@@ -13,18 +18,18 @@ class Sprite:
         if file_path is None:
             self.surface = p.Surface((width, height))
             self.surface.fill((red, green, blue))
+            allocations.surfaces += 1
         else:
-            self.surface = p.image.load(file_path).convert_alpha()
-            self.surface = p.transform.scale(self.surface, (width, height))
+            # Shared with every other sprite using the same image and size
+            self.surface = textures.get(file_path, width, height)
 
         self.position = Vector(x, y)
         self.velocity = Vector(0, 0)
         self.width = width
         self.height = height
 
-    def update(self, dt):   # changes sprite position based on velocity
-        movement = Vector(self.velocity.x * dt, self.velocity.y * dt)
-        self.position += movement
+    def update(self, dt):   # changes sprite position based on velocity, without making new vectors
+        self.position.add_scaled(self.velocity, dt)
 
     def get_top(self):
         return self.position.y
@@ -0,0 +1,37 @@
+import pygame as p
+
+# Sprite layer
+# A batch of (surface, position) pairs that the renderer sends to the screen in one Surface.blits() call,
+# e.g. every note in a lane. Whoever fills it culls against bounds first (the note pool and field do it
+# for a whole lane at once), so notes waiting off the right edge or already past the left one
+# cost nothing to draw.
+# Layers are drawn in order of z, lowest first. The renderer clears them once they've been drawn.
+
+class SpriteLayer:
+    def __init__(self, z: int = 0, bounds=None):
+        self.z = z
+        self.bounds = None if bounds is None else p.Rect(bounds)
+        self.items = []
+        self.drawn_items = []  # what was on screen last frame
+        self.area = None  # rect covering everything in items
+        self.drawn_area = None
+        self.changed = False  # set when a surface was redrawn in place without moving
+
+    def extend(self, items, area):
+        # Adds many (surface, (x, y)) pairs at once that the caller has already culled, area covers them all
+        self.items.extend(items)
+        if self.area is None:
+            self.area = p.Rect(area)
+        else:
+            self.area.union_ip(area)
+
+    def dirty(self) -> bool:
+        # Whether anything in the layer looks different from last frame
+        return self.changed or self.items != self.drawn_items
+
+    def finish_frame(self):
+        self.drawn_items = self.items
+        self.drawn_area = self.area
+        self.items = []
+        self.area = None
+        self.changed = False
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+import pygame as p
+from asset_manifest import assets
+from profiler import allocations
+
+# Texture cache
+# Keeps decoded and scaled surfaces keyed by (path, size, alpha mode)
+# so an image is only read from disk once per run.
+# Least recently used surfaces are dropped when the memory budget is exceeded.
+# Images baked at the size asked for (see bake_assets.py) are loaded as they are, with no scaling.
+# Surfaces handed out are shared - copy them before drawing onto them!
+
+class TextureCache:
+    def __init__(self, budget_bytes: int = 64 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_loads = 0
+        self.bytes = 0
+
+    def get(self, file_path: str, width: int = None, height: int = None, alpha: bool = True):
+        # Returns the image at file_path scaled to (width, height)
+        # Leave width and height as None to get the image at its original size
+        size = None if width is None else (int(width), int(height))
+        key = (file_path, size, alpha)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        baked = None if size is None else assets.image(file_path, *size)
+        if size is None:
+            surface = p.image.load(file_path)
+            self.disk_loads += 1
+            surface = surface.convert_alpha() if alpha else surface.convert()
+            allocations.surfaces += 2  # loaded, then converted for the display
+        elif baked is not None:
+            surface = p.image.load(baked[0])
+            self.disk_loads += 1
+            # Baked images with no see-through pixels were saved without alpha, which is also faster to blit
+            surface = surface.convert_alpha() if alpha and baked[1] else surface.convert()
+            allocations.surfaces += 2
+        else:
+            surface = p.transform.scale(self.get(file_path, alpha=alpha), size)
+            allocations.surfaces += 1
+        self.add(key, surface)
+        return surface
+
+    def add_source(self, file_path: str, surface, alpha: bool = True, width: int = None, height: int = None,
+                   baked_alpha: bool = True):
+        # Stores an image that was loaded elsewhere (e.g. on a loading thread) as if get() had read it
+        # width and height are for a baked image that is already that size
+        size = None if width is None else (int(width), int(height))
+        key = (file_path, size, alpha)
+        allocations.surfaces += 1  # the load elsewhere
+        if key not in self.surfaces:
+            self.disk_loads += 1
+            allocations.surfaces += 1
+            self.add(key, surface.convert_alpha() if alpha and baked_alpha else surface.convert())
+
+    def preload(self, file_path: str, width: int = None, height: int = None, alpha: bool = True):
+        # Loads a texture ahead of time so the first real use is a cache hit
+        self.get(file_path, width, height, alpha)
+
+    def add(self, key, surface):
+        self.surfaces[key] = surface
+        self.bytes += surface_bytes(surface)
+
+        # Evict the oldest textures until back under budget, always keeping the newest one
+        while self.bytes > self.budget_bytes and len(self.surfaces) > 1:
+            old_key, old_surface = self.surfaces.popitem(last=False)
+            self.bytes -= surface_bytes(old_surface)
+            self.evictions += 1
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_loads": self.disk_loads,
+            "bytes": self.bytes,
+            "entries": len(self.surfaces),
+        }
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+# Shared cache used by Sprite, Label and Button
+textures = TextureCache()
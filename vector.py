@@ -1,8 +1,44 @@
 class Vector:
+    # Only x and y are stored, no per-vector __dict__, so thousands of notes stay small
+    __slots__ = ("x", "y")
+
     def __init__(self, x: float, y: float):
         self.x = x
         self.y = y
     def __add__(self, other: "Vector") -> "Vector":
         return Vector(self.x + other.x, self.y + other.y)
+    def __sub__(self, other: "Vector") -> "Vector":
+        return Vector(self.x - other.x, self.y - other.y)
+    def __mul__(self, scale: float) -> "Vector":
+        return Vector(self.x * scale, self.y * scale)
+    __rmul__ = __mul__
+
+    # In-place versions change this vector instead of making a new one
+    def __iadd__(self, other: "Vector") -> "Vector":
+        self.x += other.x
+        self.y += other.y
+        return self
+    def __isub__(self, other: "Vector") -> "Vector":
+        self.x -= other.x
+        self.y -= other.y
+        return self
+    def __imul__(self, scale: float) -> "Vector":
+        self.x *= scale
+        self.y *= scale
+        return self
+    def add_scaled(self, other: "Vector", scale: float) -> "Vector":
+        # self += other * scale without the temporary vector, e.g. position.add_scaled(velocity, dt)
+        self.x += other.x * scale
+        self.y += other.y * scale
+        return self
+    def set(self, x: float, y: float) -> "Vector":
+        self.x = x
+        self.y = y
+        return self
+
+    def __iter__(self):
+        # Lets a vector be unpacked or passed where pygame wants an (x, y) pair
+        yield self.x
+        yield self.y
     def __str__(self):
-        return f"({self.x}, {self.y})"
\ No newline at end of file
+        return f"({self.x}, {self.y})"
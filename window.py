@@ -2,14 +2,28 @@ import time
 import pygame as p
 
 class Window:
-    def __init__(self, width: int, height: int, caption: str, fullscreen: str):
+    def __init__(self, width: int, height: int, caption: str, fullscreen: str, vsync: bool = False):
         p.display.set_caption(caption)
-        self.previous_time = time.time()
+        self.previous_time = time.perf_counter_ns()
+        # Everything is laid out for this size, the render target scales it to the real window
+        self.logical_size = (width, height)
+        self.viewport = p.Rect(0, 0, width, height)  # where the logical screen sits in the window
+        self.scale = 1.0
 
-        if fullscreen == "y":
-            self.window = p.display.set_mode((width, height), p.FULLSCREEN)
-        else:
-            self.window = p.display.set_mode((width, height), p.RESIZABLE)
+        flags = p.FULLSCREEN if fullscreen == "y" else p.RESIZABLE
+        # SDL only syncs to the display's refresh through its renderer, which needs SCALED
+        self.vsync = False
+        if vsync:
+            try:
+                self.window = p.display.set_mode((width, height), flags | p.SCALED, vsync=1)
+                self.vsync = True
+            except p.error:
+                pass
+        if not self.vsync:
+            # Fullscreen uses the screen's own resolution instead of changing it
+            size = (0, 0) if fullscreen == "y" else (width, height)
+            self.window = p.display.set_mode(size, flags)
+        self.update_viewport()
 
     def draw(self, sprite):
         self.window.blit(sprite.surface, (sprite.position.x, sprite.position.y))
@@ -21,10 +35,23 @@ class Window:
         self.window.fill((0, 0, 0))
 
     def get_dt(self):
-        current_time = time.time()
-        dt = current_time - self.previous_time
+        current_time = time.perf_counter_ns()
+        dt = (current_time - self.previous_time) / 1_000_000_000
         self.previous_time = current_time
         return dt
 
     def get_size(self):
-        return self.window.get_size()
\ No newline at end of file
+        return self.window.get_size()
+
+    def update_viewport(self):
+        # Fits the logical screen in the middle of the window, as big as it goes without stretching
+        self.window = p.display.get_surface()
+        window_width, window_height = self.window.get_size()
+        width, height = self.logical_size
+        self.scale = min(window_width / width, window_height / height)
+        self.viewport.size = (round(width * self.scale), round(height * self.scale))
+        self.viewport.topleft = ((window_width - self.viewport.width) // 2, (window_height - self.viewport.height) // 2)
+
+    def to_logical(self, position):
+        # Window pixels (e.g. a mouse position) to logical ones
+        return ((position[0] - self.viewport.x) / self.scale, (position[1] - self.viewport.y) / self.scale)